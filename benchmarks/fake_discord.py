@@ -0,0 +1,173 @@
+# ========== Imports ==========
+import asyncio
+import datetime
+import random
+from typing import AsyncIterator, Optional
+
+import discord
+
+
+# ========== Constants ==========
+PAGE_SIZE = 100         # messages per history request, same as Discord's limit
+
+
+# ========== Fake Discord Objects ==========
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+
+
+class FakeMessage:
+    """The part of discord.Message the fetcher reads."""
+
+    def __init__(self, message_id: int, content: str, author_id: int):
+        self.id = message_id
+        self.content = content
+        self.author = FakeUser(author_id)
+
+
+class FakeTextChannel:
+    """
+    In-process stand-in for discord.TextChannel, serving a fixed list of messages.
+
+    `history()` supports the arguments the fetcher uses (after, before, oldest_first, limit)
+    and sleeps `page_latency` seconds every PAGE_SIZE messages to imitate a REST round trip.
+    """
+
+    def __init__(self, channel_id: int, guild: FakeGuild, messages: list[FakeMessage], page_latency: float = 0.0):
+        self.id = channel_id
+        self.guild = guild
+        self.name = f"fake-{channel_id}"
+        self.mention = f"<#{channel_id}>"
+        self.messages = sorted(messages, key=lambda message: message.id)
+        self.page_latency = page_latency
+        self.pages_served = 0
+        self.sent: list = []
+
+    async def history(
+        self,
+        limit: Optional[int] = 100,
+        after: Optional[discord.abc.Snowflake] = None,
+        before: Optional[discord.abc.Snowflake] = None,
+        oldest_first: Optional[bool] = None
+    ) -> AsyncIterator[FakeMessage]:
+        low = after.id if after is not None else 0
+        high = before.id if before is not None else 1 << 64
+        selected = [message for message in self.messages if low < message.id < high]
+        if not oldest_first:
+            selected.reverse()
+        if limit is not None:
+            selected = selected[:limit]
+
+        for index, message in enumerate(selected):
+            if index % PAGE_SIZE == 0:
+                self.pages_served += 1
+                await asyncio.sleep(self.page_latency)
+            yield message
+
+    async def send(self, **kwargs):
+        self.sent.append(kwargs)
+
+
+class FakeClient:
+    """In-process stand-in for discord.Client that knows a fixed set of channels."""
+
+    def __init__(self, channels: list[FakeTextChannel]):
+        self._channels = {channel.id: channel for channel in channels}
+
+    def get_channel(self, channel_id: int) -> Optional[FakeTextChannel]:
+        return self._channels.get(channel_id)
+
+    async def fetch_channel(self, channel_id: int) -> FakeTextChannel:
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Channel")
+        return channel
+
+
+class _FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "Not Found"
+
+
+# ========== Synthetic Data ==========
+def make_known_users(alias_count: int, aliases_per_user: int = 3) -> dict[str, list[str]]:
+    """Build a known_users dict with `alias_count` aliases in total."""
+    known_users: dict[str, list[str]] = {}
+    for index in range(alias_count):
+        primary_name = f"User{index // aliases_per_user}"
+        known_users.setdefault(primary_name, []).append(
+            primary_name if index % aliases_per_user == 0 else f"{primary_name} alias{index % aliases_per_user}"
+        )
+    return known_users
+
+
+def make_messages(
+    count: int,
+    channel_id: int,
+    quote_density: float = 0.3,
+    multi_quote_ratio: float = 0.2,
+    curly_ratio: float = 0.5,
+    author_pool: int = 200,
+    sender_pool: int = 50,
+    seed: int = 0
+) -> list[FakeMessage]:
+    """
+    Build `count` synthetic messages, oldest first, spread over the lifetime of the channel.
+
+    Args:
+        count: Amount of messages
+        channel_id: Snowflake of the channel, every message ID is newer
+        quote_density: Share of messages that contain quotes
+        multi_quote_ratio: Share of quote messages holding 2 to 4 quotes
+        curly_ratio: Share of quotes using curly instead of straight quotes
+        author_pool: Amount of different quoted authors ("User0", "User0 alias1", ...)
+        sender_pool: Amount of different senders
+        seed: Random seed, same seed gives the same messages
+    """
+    rng = random.Random(seed)
+    start = discord.utils.snowflake_time(channel_id)
+    span = (discord.utils.utcnow() - start).total_seconds()
+    words = "the a quote said never always why cat dog pizza monday tomorrow really honestly".split()
+
+    messages: list[FakeMessage] = []
+    for index in range(count):
+        created_at = start + datetime.timedelta(seconds=span * (index + 1) / (count + 1))
+        message_id = discord.utils.time_snowflake(created_at) + index % 4096
+
+        if rng.random() < quote_density:
+            amount = rng.randint(2, 4) if rng.random() < multi_quote_ratio else 1
+            parts = []
+            for _ in range(amount):
+                text = " ".join(rng.choice(words) for _ in range(rng.randint(3, 15)))
+                author = f"User{rng.randrange(author_pool // 3 + 1)}"
+                if rng.random() < 0.3:
+                    author += f" alias{rng.randint(1, 2)}"
+                open_quote, close_quote = ("“", "”") if rng.random() < curly_ratio else ('"', '"')
+                parts.append(f"{open_quote}{text}{close_quote}\n{rng.choice('-~')} {author}")
+            content = "\n\n".join(parts)
+        else:
+            content = " ".join(rng.choice(words) for _ in range(rng.randint(1, 20)))
+
+        messages.append(FakeMessage(message_id, content, rng.randrange(sender_pool) + 1))
+
+    return messages
+
+
+def make_channel(
+    message_count: int,
+    page_latency: float = 0.0,
+    age_days: int = 730,
+    **message_options
+) -> FakeTextChannel:
+    """Build a fake channel created `age_days` ago holding `message_count` synthetic messages."""
+    created_at = discord.utils.utcnow() - datetime.timedelta(days=age_days)
+    channel_id = discord.utils.time_snowflake(created_at)
+    messages = make_messages(message_count, channel_id, **message_options)
+    return FakeTextChannel(channel_id, FakeGuild(channel_id - 1), messages, page_latency)
@@ -0,0 +1,81 @@
+"""
+Differential corpus for the quote tokenizer: messages with the quotes scan_quotes() must find.
+
+`regex_agrees` tells whether the reference QUOTE_REGEX finds the same, the cases where it doesn't
+are the ones the scanner was written for. benchmarks/tokenizer.py checks both.
+"""
+
+# ========== Imports ==========
+from typing import NamedTuple
+
+from quotes.tokenizer import QuotePair
+
+
+# ========== Corpus ==========
+class Case(NamedTuple):
+    name: str
+    content: str
+    expected: list[QuotePair]
+    regex_agrees: bool = True
+
+
+CORPUS: list[Case] = [
+    # ---------- the usual format, both agree ----------
+    Case("straight", '"I never said that"\n- Bob', [("I never said that", "Bob")]),
+    Case("curly", "“pizza is a vegetable”\n- Alice", [("pizza is a vegetable", "Alice")]),
+    Case("tilde", '"why"\n~ Bob', [("why", "Bob")]),
+    Case("mixed marks", '“close enough"\n- Bob', [("close enough", "Bob")]),
+    Case("no space after dash", '"hi"\n-Bob', [("hi", "Bob")]),
+    Case("author with spaces", '"hi"\n- Bob the Builder', [("hi", "Bob the Builder")]),
+    Case("name below dash", '"hi"\n-\nBob', [("hi", "Bob")]),
+    Case("blank line before dash", '"hi"\n\n- Bob', [("hi", "Bob")]),
+    Case("several quotes", '"one"\n- A\n\n“two”\n~ B\n"three"\n- C', [("one", "A"), ("two", "B"), ("three", "C")]),
+    Case("multi-line quote", '"first line\nsecond line"\n- Bob', [("first line\nsecond line", "Bob")]),
+    Case("list inside quote", '"shopping:\n- milk\n- eggs"\n- Mom', [("shopping:\n- milk\n- eggs", "Mom")]),
+    Case("chatter before", 'lmao\n"no u"\n- Bob', [("no u", "Bob")]),
+    Case("chatter on the same line", 'context: "no u"\n- Bob', [("no u", "Bob")]),
+    Case("earlier closed quote", 'he said "x"\n"actual quote"\n- Bob', [("actual quote", "Bob")]),
+    Case("dialogue keeps last line", '"hey"\n"what"\n- Bob', [("what", "Bob")]),
+    Case("marks in author", '"hi"\n- Bob "the builder"', [("hi", 'Bob "the builder"')]),
+    Case("curly pairs in a line", "“a” said “b”\n- Bob", [("b", "Bob")]),
+    Case("straight pairs in a line", '"a" said "b"\n- Bob', [("b", "Bob")]),
+    Case("two short pairs", '"x" and "y"\n- B', [("y", "B")]),
+    Case("two long pairs", '"quote one" and "quote two"\n- Bob', [("quote two", "Bob")]),
+    Case("dash starting the quote", '"- not an attribution"\n- Bob', [("- not an attribution", "Bob")]),
+    Case("pair in brackets", 'he was like ("no") and "yes"\n- Bob', [("yes", "Bob")]),
+    Case("inch mark before", 'he is 6"2 and said "hi"\n- Bob', [("hi", "Bob")]),
+    Case("emoji", '"🍕 time"\n- Bob 🎉', [("🍕 time", "Bob 🎉")]),
+    Case("no attribution", '"just a quote"', []),
+    Case("no quote", "nothing to see here\n- Bob", []),
+    Case("empty quote", '""\n- Bob', []),
+    Case("unterminated", '"no end\n- Bob', []),
+    Case("hyphenated word", 'that was "well"-known', []),
+    Case("sentence dash", 'she said "no" - to everything', []),
+
+    # ---------- cases the regex gets wrong ----------
+    Case("crlf", '"hi"\r\n- Bob\r\n', [("hi", "Bob")], regex_agrees=False),
+    Case("whitespace line before dash", '"hi"\n   \n- Bob', [("hi", "Bob")], regex_agrees=False),
+    Case("trailing space after mark", '"hi" \n- Bob', [("hi", "Bob")], regex_agrees=False),
+    Case("indented dash", '"hi"\n  - Bob', [("hi", "Bob")], regex_agrees=False),
+    Case("en dash", '"hi"\n– Bob', [("hi", "Bob")], regex_agrees=False),
+    Case("em dash", "“hi”\n— Bob", [("hi", "Bob")], regex_agrees=False),
+    Case("double dash", '"hi"\n-- Bob', [("hi", "Bob")], regex_agrees=False),
+    Case("same line", '"hi" - Bob', [("hi", "Bob")], regex_agrees=False),
+    Case("same line em dash", "“hi” — Bob", [("hi", "Bob")], regex_agrees=False),
+    Case("whitespace quote", '" "\n- Bob', [], regex_agrees=False),
+    Case("trailing spaces in author", '"hi"\n- Bob  ', [("hi", "Bob")], regex_agrees=False),
+    Case("nested straight", '"he said "hi" to me"\n- Bob', [('he said "hi" to me', "Bob")], regex_agrees=False),
+    Case("nested curly", "“he said “hi” to me”\n- Bob", [("he said “hi” to me", "Bob")], regex_agrees=False),
+    Case(
+        "nested over lines",
+        '"so then he goes\n"you can\'t park there"\nand I just left"\n- Bob',
+        [('so then he goes\n"you can\'t park there"\nand I just left', "Bob")],
+        regex_agrees=False
+    ),
+    Case(
+        "several quotes, new formats",
+        "“one”\r\n— A\r\n\r\n\"two\" – B\n\n\"three \"3\"\"\n  ~ C",
+        [("one", "A"), ("two", "B"), ('three "3"', "C")],
+        regex_agrees=False
+    ),
+]
@@ -0,0 +1,192 @@
+"""
+Offline benchmarks of the hot paths, no Discord connection needed.
+
+Usage:
+    python -m benchmarks.run [--messages 20000] [--output results.json] [--compare baseline.json]
+
+Results are written as JSON (one entry per benchmark with min/median/mean in milliseconds),
+so two runs can be compared with --compare.
+"""
+
+# ========== Imports ==========
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from benchmarks.fake_discord import make_channel, make_known_users
+from core.alias_matcher import AliasMatcher
+from core.cache import QuoteCache
+from core.quote_store import QuoteStore
+from core.quotestats import QuoteStats
+from quotes.embeds import create_leaderboard_embed
+from quotes.fetcher import fetch_message_history_quotes
+
+
+# ========== Constants ==========
+ALIAS_COUNTS = (1, 10, 100, 500)
+REGRESSION_RATIO = 1.2      # --compare flags benchmarks that got this much slower
+
+
+# ========== Timing ==========
+def summarize(name: str, params: dict, timings: list[float]) -> dict:
+    return {
+        "name": name,
+        "params": params,
+        "runs": len(timings),
+        "min_ms": min(timings) * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+        "mean_ms": statistics.fmean(timings) * 1000,
+    }
+
+
+def time_sync(fn: Callable, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+# ========== Benchmarks ==========
+async def bench_backfill(args, with_store: bool) -> dict:
+    """Cold fetch of a whole channel: paging, parsing, storing and caching."""
+    timings = []
+    for _ in range(args.repeat):
+        channel = make_channel(args.messages, page_latency=args.page_latency, seed=args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = QuoteStore(os.path.join(tmp, "quotes.db")) if with_store else None
+            cache = QuoteCache(store)
+
+            start = time.perf_counter()
+            await fetch_message_history_quotes(channel, cache)
+            timings.append(time.perf_counter() - start)
+
+            if store is not None:
+                store.close()
+
+    return summarize(
+        "backfill_store" if with_store else "backfill",
+        {"messages": args.messages, "page_latency": args.page_latency},
+        timings
+    )
+
+
+def bench_daily_history(cache: QuoteCache, channel, args) -> dict:
+    """get_quote_history(daily=True) with a full set of recent daily quotes to skip."""
+    guild_id = str(channel.guild.id)
+    history = cache.get_quote_history(channel.id)
+    for position in range(0, len(history), max(len(history) // 50, 1)):
+        cache.cache_recent_history(guild_id, history.message_id(position))
+
+    timings = time_sync(lambda: cache.get_quote_history(channel.id, daily=True, guild_id=guild_id), args.repeat * 10)
+    return summarize("get_quote_history_daily", {"quotes": len(history)}, timings)
+
+
+def bench_stats(history, args) -> list[dict]:
+    stats = QuoteStats(history)
+    results = [summarize("count_quotes_made", {"quotes": len(history)}, time_sync(stats.count_quotes_made, args.repeat))]
+
+    for alias_count in ALIAS_COUNTS:
+        matcher = AliasMatcher(make_known_users(alias_count))
+        results.append(summarize(
+            "count_total_quotes",
+            {"quotes": len(history), "aliases": alias_count},
+            time_sync(lambda: stats.count_total_quotes(matcher), args.repeat)
+        ))
+
+    return results
+
+
+def bench_leaderboard_embed(history, args) -> dict:
+    stats = QuoteStats(history)
+    sender_data = stats.count_quotes_made()
+    quoted_data = stats.count_total_quotes(AliasMatcher(make_known_users(100)))
+
+    def render():
+        for page in (0, 1):
+            create_leaderboard_embed(sender_data, quoted_data, page)
+
+    return summarize("create_leaderboard_embed", {"pages": 2}, time_sync(render, args.repeat * 10))
+
+
+async def run(args) -> dict:
+    results = [await bench_backfill(args, with_store=False), await bench_backfill(args, with_store=True)]
+
+    # the remaining benchmarks share one warm cache
+    channel = make_channel(args.messages, seed=args.seed)
+    cache = QuoteCache()
+    history = await fetch_message_history_quotes(channel, cache)
+
+    results.append(bench_daily_history(cache, channel, args))
+    results.extend(bench_stats(history, args))
+    results.append(bench_leaderboard_embed(history, args))
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "messages": args.messages,
+            "seed": args.seed,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+# ========== Reporting ==========
+def result_key(result: dict) -> str:
+    params = ",".join(f"{key}={value}" for key, value in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def compare(report: dict, baseline_path: str) -> bool:
+    """Print the change against a baseline run. Returns False if anything regressed."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result_key(result): result for result in json.load(f)["results"]}
+
+    ok = True
+    for result in report["results"]:
+        old = baseline.get(result_key(result))
+        if old is None:
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else 1.0
+        flag = "REGRESSION" if ratio > REGRESSION_RATIO else ""
+        ok = ok and not flag
+        print(f"{result_key(result):<60} {old['median_ms']:>10.3f} -> {result['median_ms']:>10.3f} ms  x{ratio:.2f} {flag}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline Daily Quotes benchmarks")
+    parser.add_argument("--messages", type=int, default=20000, help="synthetic messages in the channel")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="seconds per fake history page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="JSON report of an earlier run to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        return 0 if compare(report, args.compare) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
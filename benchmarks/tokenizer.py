@@ -0,0 +1,179 @@
+"""
+Differential check and throughput benchmark of the quote tokenizer against QUOTE_REGEX.
+
+The bot parses with extract_quotes(): QUOTE_REGEX when its result is complete, scan_quotes() otherwise
+and right away for messages with many quote marks.
+
+Usage:
+    python -m benchmarks.tokenizer [--messages 20000] [--repeat 5] [--seed 0] [--show 5]
+
+1. Every case of benchmarks/quote_corpus.py must give its expected quotes, and the regex must
+   agree exactly on the cases marked `regex_agrees`.
+2. Synthetic channel messages (the format both understand) must parse the same with both.
+3. Random messages built from quote marks, dashes and line breaks are compared and the
+   disagreements are counted, --show prints a few of them. Messages where the regex finds a quote
+   the scanner doesn't (ignoring blank quotes and authors the scanner rejects) are counted as lost.
+4. extract_quotes() must give the same result as scan_quotes() on everything above.
+5. Throughput of the three in MB/s (UTF-8) on the synthetic messages, on quote messages only
+   and on medium and long messages full of quote marks and line breaks. extract_quotes() should
+   keep up with the faster of the other two on each.
+
+Exits with 1 if a check of 1., 2. or 4. fails.
+"""
+
+# ========== Imports ==========
+import argparse
+import random
+import sys
+import time
+from typing import Callable
+
+from benchmarks.fake_discord import make_messages
+from benchmarks.quote_corpus import CORPUS
+from quotes.tokenizer import DASHES, QuotePair, extract_quotes, regex_quotes, scan_quotes
+
+
+# ========== Constants ==========
+FUZZ_ALPHABET = ['"', "“", "”", "\n", "\n", "\r\n", " ", " ", "-", "~", "—", "a", "bob", "said", "xyz"]
+MEDIUM_MESSAGE_LINES = 40
+LONG_MESSAGE_LINES = 2000
+
+Parser = Callable[[str], list[QuotePair]]
+
+
+# ========== Differential ==========
+def check_corpus() -> list[str]:
+    """Run the hand written corpus. Returns the failures."""
+    failures = []
+    for case in CORPUS:
+        scanned = scan_quotes(case.content)
+        if scanned != case.expected:
+            failures.append(f"scanner  {case.name}: {scanned!r} != {case.expected!r}")
+
+        agrees = regex_quotes(case.content) == case.expected
+        if agrees != case.regex_agrees:
+            failures.append(f"regex    {case.name}: expected to {'agree' if case.regex_agrees else 'differ'}")
+    return failures
+
+
+def check_generated(contents: list[str]) -> list[str]:
+    """Both parsers must agree on messages in the standard format."""
+    return [
+        f"generated: {content!r}"
+        for content in contents
+        if scan_quotes(content) != regex_quotes(content)
+    ]
+
+
+def fuzz_messages(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(1, 40))) for _ in range(count)]
+
+
+def fuzz(contents: list[str]) -> list[tuple[str, list[QuotePair], list[QuotePair]]]:
+    """Compare both parsers on random messages. Returns (content, regex, scanner) of every disagreement."""
+    differences = []
+    for content in contents:
+        expected, scanned = regex_quotes(content), scan_quotes(content)
+        if expected != scanned:
+            differences.append((content, expected, scanned))
+    return differences
+
+
+def lost_quotes(expected: list[QuotePair], scanned: list[QuotePair]) -> list[QuotePair]:
+    """Quotes of the regex with text and an author that no quote of the scanner contains."""
+    scanned_text = " ".join(quote for quote, _ in scanned)
+    return [
+        (quote, author)
+        for quote, author in expected
+        if quote.strip() and author.strip(DASHES + " \t\r") and quote.strip() not in scanned_text
+    ]
+
+
+def check_extract(contents: list[str]) -> list[str]:
+    """The regex fast path must never change the result."""
+    return [
+        f"extract: {content!r}"
+        for content in contents
+        if extract_quotes(content) != scan_quotes(content)
+    ]
+
+
+# ========== Throughput ==========
+def long_messages(count: int, seed: int, lines_per_message: int = LONG_MESSAGE_LINES) -> list[str]:
+    """Long messages with many quote marks and line breaks but few attributions, the regex's worst case."""
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        lines = []
+        for _ in range(lines_per_message):
+            roll = rng.random()
+            if roll < 0.3:
+                lines.append('"' + "a" * rng.randint(0, 40) + '"')
+            elif roll < 0.35:
+                lines.append("")
+            elif roll < 0.36:
+                lines.append("- Bob")
+            else:
+                lines.append("some words and a “curly bit” here")
+        messages.append("\n".join(lines))
+    return messages
+
+
+def throughput(parser: Parser, contents: list[str], repeat: int) -> float:
+    """Best MB/s of `repeat` runs over every message."""
+    size = sum(len(content.encode("utf-8")) for content in contents)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in contents:
+            parser(content)
+        best = min(best, time.perf_counter() - start)
+    return size / best / 1_000_000
+
+
+# ========== Main ==========
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Quote tokenizer differential check and benchmark")
+    parser.add_argument("--messages", type=int, default=20000, help="synthetic messages to check and time")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per throughput measurement")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show", type=int, default=0, help="fuzz disagreements to print")
+    args = parser.parse_args()
+
+    contents = [message.content for message in make_messages(args.messages, channel_id=1, seed=args.seed)]
+    quote_contents = [content for content in contents if regex_quotes(content)]
+
+    random_contents = fuzz_messages(args.messages, args.seed)
+    medium_contents = long_messages(1000, args.seed, MEDIUM_MESSAGE_LINES)
+    long_contents = long_messages(20, args.seed)
+
+    failures = check_corpus() + check_generated(contents)
+    failures += check_extract([case.content for case in CORPUS] + contents + random_contents + medium_contents + long_contents)
+    print(f"corpus: {len(CORPUS)} cases, generated: {len(contents)} messages, failures: {len(failures)}")
+    for failure in failures:
+        print(f"  {failure}")
+
+    differences = fuzz(random_contents)
+    lost = [difference for difference in differences if lost_quotes(difference[1], difference[2])]
+    print(f"fuzz: {len(differences)}/{args.messages} random messages parsed differently, {len(lost)} lost a quote")
+    for content, expected, scanned in (lost + differences)[:args.show]:
+        print(f"  {content!r}\n    regex:   {expected!r}\n    scanner: {scanned!r}")
+
+    print(f"\n{'input':<16}{'regex MB/s':>12}{'scanner MB/s':>14}{'extract MB/s':>14}")
+    for name, inputs in (
+        ("all messages", contents),
+        ("quotes only", quote_contents),
+        ("medium messages", medium_contents),
+        ("long messages", long_contents),
+    ):
+        print(
+            f"{name:<16}{throughput(regex_quotes, inputs, args.repeat):>12.1f}"
+            f"{throughput(scan_quotes, inputs, args.repeat):>14.1f}{throughput(extract_quotes, inputs, args.repeat):>14.1f}"
+        )
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
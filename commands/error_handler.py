@@ -2,11 +2,16 @@
 import discord
 from discord import app_commands
 
+from core.metrics import metrics
+
 
 # ========== Error Handler Registration ==========
 def register_errors(tree):
     @tree.error
     async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+        command = interaction.command.qualified_name if interaction.command else "unknown"
+        metrics.inc("command_errors_total", command=command, error=type(error).__name__)
+
         if isinstance(error, app_commands.CheckFailure):
             await interaction.response.send_message("You are not authorized to use this command!", ephemeral=True)
             return
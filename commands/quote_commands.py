@@ -1,43 +1,106 @@
 # ========== Imports ==========
+import asyncio
 import discord
-import time
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from discord import app_commands
 
 from core.config_manager import ConfigManager
 from core.cache import QuoteCache
 from core.quote_service import fetch_random_quote_for_guild
-from quotes.fetcher import fetch_message_history_quotes
-from core.helpers import get_configured_channels
-from quotes.embeds import create_quote_embed, create_info_embed, create_leaderboard_embed
-from core.quotestats import QuoteStats
+from quotes.fetcher import fetch_message_history_quotes, search_quotes, start_refresh
+from core.helpers import get_configured_channels, channel_resolver, window_bounds, parse_date_range
+from quotes.embeds import (
+    create_quote_embed, create_info_embed, create_leaderboard_embed, create_search_embed,
+    LEADERBOARD_SIZE, LEADERBOARD_PAGES, LEADERBOARD_WINDOWS, SEARCH_PAGE_SIZE, SEARCH_MAX_RESULTS,
+    SEARCH_MAX_QUERY
+)
+from core.alias_matcher import get_alias_matcher
+from core.metrics import metrics
+from tasks.daily_quote import DailyQuoteScheduler, parse_schedule
 
 
 class LeaderboardView(discord.ui.View):
-    def __init__(self, sender_data, quoted_data):
+    """
+    Leaderboard pages with a time window selector.
+
+    `load(window)` returns (sender_data, quoted_data) of a window. Every window is loaded
+    and every page rendered only once; switching back and forth reuses the finished embeds.
+    """
+
+    def __init__(self, load, windows: dict[str, str], window: str = "all"):
         super().__init__()      # super is to run discord stuff
         self.page = 0
-        self.sender_data = sender_data
-        self.quoted_data = quoted_data
-    
+        self.window = window
+        self.windows = windows      # key -> label
+        self._load = load
+        self._data: dict[str, tuple] = {}
+        self._embeds: dict[tuple[str, int], discord.Embed] = {}
+
+        self.select_window.options = [
+            discord.SelectOption(label=label, value=key, default=key == window) for key, label in windows.items()
+        ]
+
+    def embed(self) -> discord.Embed:
+        key = (self.window, self.page)
+        if key not in self._embeds:
+            if self.window not in self._data:
+                self._data[self.window] = self._load(self.window)
+            sender_data, quoted_data = self._data[self.window]
+            self._embeds[key] = create_leaderboard_embed(sender_data, quoted_data, self.page, self.windows[self.window])
+        return self._embeds[key]
+
     @discord.ui.button(label="⬅️", style=discord.ButtonStyle.primary)
     async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
         # you can only go back if we're not at the start
         if self.page > 0:
             self.page -=1
         
-        await interaction.response.edit_message(
-            embed=create_leaderboard_embed(self.sender_data, self.quoted_data, self.page),
-            view=self)
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+
+    @discord.ui.button(label="➡️", style=discord.ButtonStyle.primary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.page < LEADERBOARD_PAGES - 1:
+            self.page += 1
+
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.select(placeholder="Time window")
+    async def select_window(self, interaction: discord.Interaction, select: discord.ui.Select):
+        self.window = select.values[0]
+        for option in select.options:
+            option.default = option.value == self.window
+
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+
+class SearchView(discord.ui.View):
+    def __init__(self, query, results, source_channel):
+        super().__init__()
+        self.page = 0
+        self.query = query
+        self.results = results
+        self.source_channel = source_channel
+        self.page_count = max((len(results) + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE, 1)
+
+    def embed(self) -> discord.Embed:
+        return create_search_embed(self.query, self.results, self.page, self.source_channel)
+
+    @discord.ui.button(label="⬅️", style=discord.ButtonStyle.primary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.page > 0:
+            self.page -= 1
 
+        await interaction.response.edit_message(embed=self.embed(), view=self)
 
     @discord.ui.button(label="➡️", style=discord.ButtonStyle.primary)
     async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.page += 1
+        if self.page < self.page_count - 1:
+            self.page += 1
+
+        await interaction.response.edit_message(embed=self.embed(), view=self)
 
-        await interaction.response.edit_message(
-        embed=create_leaderboard_embed(self.sender_data, self.quoted_data, self.page),
-        view=self
-    )
 
 # ========== Admin Wrapper ==========
 def validation(config_manager: ConfigManager, admin_flag: bool = False):
@@ -82,7 +145,7 @@ def validation(config_manager: ConfigManager, admin_flag: bool = False):
 
 
 # ========== Slash Command Registration ==========
-def register_commands(tree, config_manager: ConfigManager, cache: QuoteCache):
+def register_commands(tree, config_manager: ConfigManager, cache: QuoteCache, scheduler: DailyQuoteScheduler):
     """
     Register all slash commands.
     
@@ -90,6 +153,7 @@ def register_commands(tree, config_manager: ConfigManager, cache: QuoteCache):
         tree: Discord command tree
         config_manager: ConfigManager instance
         cache: QuoteCache instance
+        scheduler: DailyQuoteScheduler instance
     """
     mod_check = validation(config_manager)
     admin_check = validation(config_manager, True)
@@ -97,9 +161,8 @@ def register_commands(tree, config_manager: ConfigManager, cache: QuoteCache):
 
     @tree.command(name="quote", description="Send a random quote from a source channel to a target channel")
     @app_commands.guild_only()
-    async def random_quote(interaction: discord.Interaction):
-        start = time.perf_counter()
-
+    @app_commands.describe(person="Only draw quotes of this known user (name or alias)")
+    async def random_quote(interaction: discord.Interaction, person: Optional[str] = None):
         assert interaction.guild_id is not None
         guild_data = config_manager.get_guild(interaction.guild_id)
 
@@ -107,24 +170,45 @@ def register_commands(tree, config_manager: ConfigManager, cache: QuoteCache):
             await interaction.response.send_message("Channels not configured!", ephemeral=True)
             return
 
+        # names and aliases both resolve to the primary user
+        primary_name = None
+        if person is not None:
+            primary_name = get_alias_matcher(guild_data).resolve(person.strip())
+            if primary_name is None:
+                await interaction.response.send_message(f"'{person}' is not a known user. Add them with /set_names first.", ephemeral=True)
+                return
+
         await interaction.response.defer()
 
-        quote_result = await fetch_random_quote_for_guild(guild_data, interaction.client, cache)
+        quote_result = await fetch_random_quote_for_guild(guild_data, interaction.client, cache, person=primary_name)
         if quote_result is None:
-            await interaction.edit_original_response(content="No quotes found in the configured source channel!")
+            if primary_name is not None:
+                await interaction.edit_original_response(content=f"No quotes of {primary_name} found in the configured source channel!")
+            else:
+                await interaction.edit_original_response(content="No quotes found in the configured source channel!")
             return
 
         _, target_channel, quote = quote_result
-        quote_embed = create_quote_embed(quote)
-        await target_channel.send(embed=quote_embed)
-
-        end = time.perf_counter()
-        print(f"Total took: {end - start:.3f}s")
+        with metrics.timer("phase_seconds", phase="embed"):
+            quote_embed = create_quote_embed(quote)
+        with metrics.timer("phase_seconds", phase="send"):
+            await target_channel.send(embed=quote_embed)
 
         if isinstance(target_channel, discord.abc.GuildChannel):
             await interaction.delete_original_response()
 
 
+    @random_quote.autocomplete("person")
+    async def person_autocomplete(interaction: discord.Interaction, current: str):
+        assert interaction.guild_id is not None
+        guild_data = config_manager.get_guild(interaction.guild_id)
+        return [
+            app_commands.Choice(name=primary_name, value=primary_name)
+            for primary_name in guild_data.known_users
+            if current.lower() in primary_name.lower()
+        ][:25]
+
+
     @tree.command(name="source", description="Set the specified channel as the source channel.")
     @app_commands.guild_only()
     @mod_check
@@ -132,6 +216,12 @@ def register_commands(tree, config_manager: ConfigManager, cache: QuoteCache):
         assert interaction.guild_id is not None
         
         guild_data = config_manager.get_guild(interaction.guild_id)
+        channel_resolver.invalidate(guild_data.source_channel, source_channel.id)
+
+        # stop serving the quotes of the old source channel (they stay on disk)
+        if guild_data.source_channel is not None and guild_data.source_channel != source_channel.id:
+            cache.clear_cache(guild_data.source_channel)
+
         guild_data.source_channel = source_channel.id
         config_manager.save()
         await interaction.response.send_message("Successfully changed the source channel!")
@@ -144,11 +234,33 @@ def register_commands(tree, config_manager: ConfigManager, cache: QuoteCache):
         assert interaction.guild_id is not None
 
         guild_data = config_manager.get_guild(interaction.guild_id)
+        channel_resolver.invalidate(guild_data.target_channel, target_channel.id)
         guild_data.target_channel = target_channel.id
         config_manager.save()
         await interaction.response.send_message("Successfully changed the target channel!")
 
 
+    @tree.command(name="schedule", description="Set when the daily quote is posted, e.g. time: 09:00, timezone: Europe/Brussels")
+    @app_commands.guild_only()
+    @mod_check
+    async def set_schedule(interaction: discord.Interaction, time: str, timezone: str = "UTC"):
+        assert interaction.guild_id is not None
+
+        try:
+            fire_time, _ = parse_schedule(time.strip(), timezone.strip())
+        except ValueError as exc:
+            await interaction.response.send_message(str(exc), ephemeral=True)
+            return
+
+        guild_data = config_manager.get_guild(interaction.guild_id)
+        guild_data.post_time = fire_time.strftime("%H:%M")
+        guild_data.timezone = timezone.strip()
+        config_manager.save()
+        scheduler.schedule(guild_data)
+
+        await interaction.response.send_message(f"Daily quotes will be posted at {guild_data.post_time} ({guild_data.timezone})!")
+
+
     @tree.command(name="info", description="Display the currently configurated settings.")
     @app_commands.guild_only()
     @mod_check
@@ -189,7 +301,7 @@ def register_commands(tree, config_manager: ConfigManager, cache: QuoteCache):
             await interaction.edit_original_response(content=f"No quotes found in {source_channel.mention}!")
             return
         
-        total_count = sum(len(message) for message in history)
+        total_count = history.line_count()
         
         plural = "s" if total_count != 1 else ""
         verb = "are" if total_count != 1 else "is"
@@ -201,11 +313,29 @@ def register_commands(tree, config_manager: ConfigManager, cache: QuoteCache):
 
     @tree.command(name="leaderboard", description="Display a leaderboard with cool info.")
     @app_commands.guild_only()
-    async def leaderboard(interaction: discord.Interaction):
+    @app_commands.describe(start="Custom range start, YYYY-MM-DD", end="Custom range end (included), YYYY-MM-DD")
+    async def leaderboard(interaction: discord.Interaction, start: Optional[str] = None, end: Optional[str] = None):
         assert interaction.guild_id is not None
 
         guild_data = config_manager.get_guild(interaction.guild_id)
-        known_users = guild_data.known_users
+
+        try:
+            zone = ZoneInfo(guild_data.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            zone = ZoneInfo("UTC")
+
+        # windows are fixed when the command runs, so the view can keep its rendered pages
+        bounds = {window: window_bounds(window, zone) for window in LEADERBOARD_WINDOWS}
+        windows = dict(LEADERBOARD_WINDOWS)
+        window = "all"
+        if start is not None or end is not None:
+            try:
+                bounds["custom"] = parse_date_range(start or "2015-01-01", end or discord.utils.utcnow().date().isoformat(), zone)
+            except ValueError as exc:
+                await interaction.response.send_message(str(exc), ephemeral=True)
+                return
+            windows["custom"] = f"{start or 'Start'} to {end or 'today'}"
+            window = "custom"
 
         channels = await get_configured_channels(guild_data, interaction.client)
         if channels is None:
@@ -214,15 +344,46 @@ def register_commands(tree, config_manager: ConfigManager, cache: QuoteCache):
         
         await interaction.response.defer()
 
-        stats = QuoteStats(await fetch_message_history_quotes(channels[0], cache))
-        sender_data = stats.count_quotes_made()
-        quoted_data = stats.count_total_quotes(known_users)
-        lb_view = LeaderboardView(sender_data, quoted_data)
+        source_channel = channels[0]
+        await fetch_message_history_quotes(source_channel, cache)
 
-        await interaction.edit_original_response(
-            embed=create_leaderboard_embed(sender_data, quoted_data, 0),
-            view=lb_view
-        )
+        # running aggregates, so only the top entries have to be picked (binary searches for a window)
+        tally = cache.get_tally(source_channel.id)
+        matcher = get_alias_matcher(guild_data)
+
+        def load(window: str):
+            start_id, end_id = bounds[window]
+            return (
+                tally.top_senders(LEADERBOARD_SIZE, start_id, end_id),
+                tally.top_quoted(guild_data.guild_id, matcher, LEADERBOARD_SIZE, start_id, end_id)
+            )
+
+        lb_view = LeaderboardView(load, windows, window)
+        await interaction.edit_original_response(embed=lb_view.embed(), view=lb_view)
+
+    @tree.command(name="search", description="Find quotes by words in the quote or the author's name.")
+    @app_commands.guild_only()
+    async def search(interaction: discord.Interaction, query: app_commands.Range[str, 1, SEARCH_MAX_QUERY]):
+        assert interaction.guild_id is not None
+
+        guild_data = config_manager.get_guild(interaction.guild_id)
+
+        channels = await get_configured_channels(guild_data, interaction.client)
+        if channels is None:
+            await interaction.response.send_message("Channels not configured!", ephemeral=True)
+            return
+
+        await interaction.response.defer()
+
+        source_channel = channels[0]
+        results = await search_quotes(source_channel, cache, query, SEARCH_MAX_RESULTS)
+
+        if not results:
+            await interaction.edit_original_response(content=f"No quotes found for '{query}'.")
+            return
+
+        search_view = SearchView(query, results, source_channel)
+        await interaction.edit_original_response(embed=search_view.embed(), view=search_view)
 
     @tree.command(name="set_names", description="Add a user to *the list* known by the system which is used for filtering")
     @app_commands.guild_only()
@@ -282,5 +443,52 @@ def register_commands(tree, config_manager: ConfigManager, cache: QuoteCache):
         guild_data.remove_authorized_user(user.id)
         config_manager.save()
         await interaction.response.send_message(content=f"Successfully removed <@{user.id}> from the moderators!")
-        
 
+    @tree.command(name="metrics", description="Show latency and cache metrics of the bot.")
+    @app_commands.guild_only()
+    @admin_check
+    async def show_metrics(interaction: discord.Interaction):
+        summary = metrics.summary()
+        if len(summary) > 1900:
+            summary = summary[:1900] + "\n..."
+        await interaction.response.send_message(content=f"```\n{summary}\n```", ephemeral=True)
+
+    @tree.command(name="refresh", description="Rescan the source channel in the background (picks up old edits and deletes).")
+    @app_commands.guild_only()
+    @admin_check
+    async def refresh(interaction: discord.Interaction):
+        assert interaction.guild_id is not None
+
+        guild_data = config_manager.get_guild(interaction.guild_id)
+
+        channels = await get_configured_channels(guild_data, interaction.client)
+        if channels is None:
+            await interaction.response.send_message("Channels not configured!", ephemeral=True)
+            return
+
+        source_channel = channels[0]
+        task = start_refresh(source_channel, cache, rebuild=True)
+        if task is None:
+            await interaction.response.send_message(f"{source_channel.mention} is already being refreshed!", ephemeral=True)
+            return
+
+        # answer right away, a rebuild can take much longer than the interaction deadline
+        await interaction.response.send_message(
+            f"Refreshing {source_channel.mention} in the background, quotes keep working meanwhile.",
+            ephemeral=True
+        )
+
+        # errors are logged by start_refresh(), only report them here
+        try:
+            history = await asyncio.shield(task)
+        except discord.Forbidden:
+            message = f"I'm not allowed to read the history of {source_channel.mention}!"
+        except Exception:
+            message = f"Refreshing {source_channel.mention} failed, try again later."
+        else:
+            message = f"Refreshed {source_channel.mention}: {history.line_count()} quotes."
+
+        try:
+            await interaction.followup.send(message, ephemeral=True)
+        except discord.HTTPException:
+            pass        # the followup token expired (15 minutes)
@@ -0,0 +1,42 @@
+# ========== Imports ==========
+import os
+import json
+import hashlib
+import discord
+from discord import app_commands
+
+
+# ========== Constants ==========
+HASH_FILE = "data/command_tree.hash"
+
+
+# ========== Command Tree Sync ==========
+def command_tree_hash(tree: app_commands.CommandTree, guild: discord.abc.Snowflake) -> str:
+    """Hash of everything Discord gets told about the commands of a guild (names, descriptions, params, ...)."""
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda command: command["name"])
+
+    content = json.dumps({"guild": guild.id, "commands": payload}, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+async def sync_if_changed(tree: app_commands.CommandTree, guild: discord.abc.Snowflake) -> bool:
+    """
+    Sync the guild's commands with Discord, but only if they changed since the last sync.
+    The hash of the last synced schema is kept on disk, so restarts and reconnects skip the sync too.
+
+    Returns:
+        bool: True if a sync was done
+    """
+    new_hash = command_tree_hash(tree, guild)
+
+    if os.path.exists(HASH_FILE):
+        with open(HASH_FILE, "r", encoding="utf-8") as f:
+            if f.read().strip() == new_hash:
+                return False
+
+    await tree.sync(guild=guild)
+
+    with open(HASH_FILE, "w", encoding="utf-8") as f:
+        f.write(new_hash)
+    return True
@@ -0,0 +1,69 @@
+# ========== Imports ==========
+import re
+from typing import Optional
+
+from core.models import GuildConfig
+
+
+# ========== AliasMatcher Class ==========
+class AliasMatcher:
+    """
+    Resolves an author string to the primary user it mentions, using one compiled regex.
+
+    All aliases of all known users are folded into a single alternation:
+        \\b(?:(?P<u0>hintrill|elias a)|(?P<u1>sabato|safloet))\\b
+
+    `re.search` returns the leftmost match, and at a given position the alternatives are tried
+    in dict order, so this picks the same primary user as checking every alias separately
+    and taking the one that appeared FIRST in the author string.
+    """
+
+    def __init__(self, known_users: dict[str, list[str]]):
+        self.key = self.make_key(known_users)
+        self._primaries: list[str] = []
+        groups: list[str] = []
+
+        for primary_user, aliases in known_users.items():
+            if not aliases:
+                continue
+            group = "|".join(re.escape(alias) for alias in aliases)
+            groups.append(f"(?P<u{len(self._primaries)}>{group})")
+            self._primaries.append(primary_user)
+
+        self._pattern = re.compile(r'\b(?:' + "|".join(groups) + r')\b', re.IGNORECASE) if groups else None
+
+    @staticmethod
+    def make_key(known_users: dict[str, list[str]]) -> tuple:
+        """Hashable snapshot of a known users mapping, changes whenever a name or alias is added."""
+        return tuple((primary, tuple(aliases)) for primary, aliases in known_users.items())
+
+    def resolve(self, author: str) -> Optional[str]:
+        """Return the primary user whose alias appears first in `author`, or None if nobody matches."""
+        if self._pattern is None:
+            return None
+
+        match = self._pattern.search(author)
+        if match is None:
+            return None
+
+        # lastgroup is "u<index>" of the primary user that matched
+        return self._primaries[int(match.lastgroup[1:])]
+
+
+# ========== Per-Guild Matchers ==========
+_matchers: dict[str, AliasMatcher] = {}
+
+def get_alias_matcher(guild_config: GuildConfig) -> AliasMatcher:
+    """
+    Return the AliasMatcher of a guild, compiling it only when its known users changed.
+
+    The mapping is compared by content, so /set_names and /add_alias invalidate it automatically.
+    """
+    known_users = guild_config.known_users
+    matcher = _matchers.get(guild_config.guild_id)
+
+    if matcher is None or matcher.key != AliasMatcher.make_key(known_users):
+        matcher = AliasMatcher(known_users)
+        _matchers[guild_config.guild_id] = matcher
+
+    return matcher
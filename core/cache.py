@@ -1,6 +1,128 @@
 # ========== Imports ==========
-from typing import Optional
-from my_types.quote_types import Quote, T_Quote, QuoteHistory, RECENTS_SIZE
+import asyncio
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Iterable, Optional
+from core.quote_store import QuoteStore
+from core.alias_matcher import AliasMatcher
+from core.quotestats import QuoteTally
+from core.quote_columns import QuoteColumns, QuoteView
+from core.search_index import SearchIndex
+from core.shuffle_bag import ShuffleBag
+from core.recent_dailies import RecentDailies
+from my_types.quote_types import Quote, QuoteMessage, RECENTS_SIZE, CACHE_MAX_BYTES, CACHE_MAX_AGE, REFRESH_RETRY_DELAY
+
+
+# ========== ChannelQuotes Class ==========
+class ChannelQuotes:
+    """
+    Cached quotes of a single source channel.
+    One of these exists per channel, so guilds never read each other's quotes.
+
+    Quotes live in compact QuoteColumns keyed by message ID, so a single message can be
+    replaced or removed in O(1). Removing swaps the last message into the hole,
+    which means the history isn't kept in message order.
+    The running tally is updated with every add and remove, and so is the search index once it exists.
+
+    The search index is the most expensive part to build, so it's only built on the first search
+    (see `QuoteCache.index_channel()`). While that build runs, changes are logged in `index_log`
+    and replayed onto the new index when it's done.
+    """
+
+    __slots__ = (
+        "channel_id", "columns", "tally", "index", "index_log", "indexing", "bags", "size",
+        "loaded_at", "refresh_failures", "retry_at"
+    )
+
+    def __init__(self, channel_id: int):
+        self.channel_id = channel_id
+        self.columns = QuoteColumns()
+        self.tally = QuoteTally()
+        self.index: Optional[SearchIndex] = None
+        self.index_log: Optional[list[tuple[int, Optional[Quote], Optional[Quote]]]] = None    # (message_id, old, new)
+        self.indexing: Optional[asyncio.Future] = None      # the index build in progress
+        self.bags: dict[str, ShuffleBag] = {}       # guild_id -> ShuffleBag
+        self.size = self._nbytes()
+        self.loaded_at = time.monotonic()      # last time this was checked against Discord
+        self.refresh_failures = 0               # background refreshes failed in a row
+        self.retry_at = 0.0                     # no background refresh before this (monotonic time)
+
+    def _nbytes(self) -> int:
+        index_bytes = self.index.nbytes() if self.index is not None else 0
+        return self.columns.nbytes() + self.tally.nbytes() + index_bytes
+
+    @classmethod
+    def build(cls, channel_id: int, messages: Iterable[QuoteMessage]) -> "ChannelQuotes":
+        """
+        Build a channel from (message_id, quote) pairs.
+        Touches nothing shared, so the fetcher runs it in an executor and only swaps the result in.
+        """
+        entry = cls(channel_id)
+        for message_id, quote in messages:
+            entry.add(message_id, quote)
+        entry.resize()
+        return entry
+
+    def add(self, message_id: int, quote: Quote) -> bool:
+        """Add or replace a message. Returns True if it's new (the caller splices it into the bags)."""
+        old_quote = self.columns.get(message_id)
+        if old_quote is not None:
+            self.tally.remove(old_quote, message_id)
+
+        self.columns.add(message_id, quote)
+        self.tally.add(quote, message_id)
+        self._index_change(message_id, old_quote, quote)
+
+        # a replaced message leaves its old rows behind, just like a removed one
+        if old_quote is not None and self.columns.needs_compaction():
+            self.columns.compact()
+        return old_quote is None
+
+    def remove(self, message_id: int):
+        """Remove a message if it's cached."""
+        quote = self.columns.remove(message_id)
+        if quote is None:
+            return
+
+        self.tally.remove(quote, message_id)
+        self._index_change(message_id, quote, None)
+        if self.columns.needs_compaction():
+            self.columns.compact()
+
+    def _index_change(self, message_id: int, old_quote: Optional[Quote], quote: Optional[Quote]):
+        """Apply a change to the search index, or log it while the index is being built."""
+        if self.index is not None:
+            _apply_index_change(self.index, message_id, old_quote, quote)
+        elif self.index_log is not None:
+            self.index_log.append((message_id, old_quote, quote))
+
+    def start_indexing(self) -> QuoteColumns:
+        """Start building the search index: returns a copy of the columns to build it from and logs changes from now on."""
+        self.index_log = []
+        return self.columns.copy()
+
+    def finish_indexing(self, index: SearchIndex):
+        """Install an index built from the copy of `start_indexing()`, replaying the changes made since."""
+        for message_id, old_quote, quote in self.index_log or ():
+            _apply_index_change(index, message_id, old_quote, quote)
+        self.index = index
+        self.index_log = None
+        self.indexing = None
+
+    def resize(self) -> int:
+        """Update `size` after changes. Returns the change in bytes."""
+        old_size = self.size
+        self.size = self._nbytes()
+        return self.size - old_size
+
+
+def _apply_index_change(index: SearchIndex, message_id: int, old_quote: Optional[Quote], quote: Optional[Quote]):
+    if old_quote is not None:
+        index.remove(message_id, old_quote)
+    if quote is not None:
+        index.add(message_id, quote)
 
 
 # ========== QuoteCache Class ==========
@@ -8,48 +130,310 @@ class QuoteCache:
     """
     RAM cache using a dictionary to access quotes without making API calls.
     Follows the same pattern as AssetCache from League bot :D.
+
+    Quotes are sharded by source channel ID. Every shard tracks its approximate size in bytes
+    and once the sum goes over `max_bytes`, the least recently used channels get evicted.
+    An evicted channel is simply rebuilt on its next use (from the QuoteStore if there is one).
+
+    The optional `store` is the on-disk QuoteStore backing this cache, so cold starts
+    don't have to rescan the whole source channel.
+
+    Channels loaded longer than `max_age` seconds ago are stale: they are still served right away,
+    while the fetcher refreshes them in the background (stale-while-revalidate).
+    A refresh that failed (e.g. the bot lost access to the channel) is retried after REFRESH_RETRY_DELAY,
+    doubling with every failure up to `max_age`, instead of on every cache hit.
     """
-    
-    def __init__(self):
-        self._quote_history: QuoteHistory = []
-        self._recent_dailies: QuoteHistory = []
+
+    def __init__(
+        self,
+        store: Optional[QuoteStore] = None,
+        max_bytes: int = CACHE_MAX_BYTES,
+        max_age: float = CACHE_MAX_AGE
+    ):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._channels: OrderedDict[int, ChannelQuotes] = OrderedDict()
+        self._total_bytes: int = 0
         self._recents_size: int = RECENTS_SIZE
+        self._recent_dailies: dict[str, RecentDailies] = {}     # guild_id -> RecentDailies
+        self.loading: dict[int, asyncio.Task] = {}              # channel_id -> in-flight fetch (see the fetcher)
+        self.refreshing: dict[int, asyncio.Task] = {}           # channel_id -> in-flight background refresh
+
+    def _touch(self, channel_id: int) -> Optional[ChannelQuotes]:
+        """Return a channel's entry and mark it as most recently used."""
+        entry = self._channels.get(channel_id)
+        if entry is not None:
+            self._channels.move_to_end(channel_id)
+        return entry
+
+    def _evict(self, keep: int):
+        """Drop least recently used channels until we're within budget. Never evicts `keep`."""
+        while self._total_bytes > self.max_bytes and len(self._channels) > 1:
+            channel_id = next(iter(self._channels))
+            if channel_id == keep:
+                break
+            self._drop(channel_id)
+
+    def _drop(self, channel_id: int):
+        entry = self._channels.pop(channel_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def has_channel(self, channel_id: int) -> bool:
+        """Check if a channel's quotes are currently cached (even if it has none)."""
+        return channel_id in self._channels
 
-    def _quote_tuple(self, quote: Quote) -> T_Quote:
-        """Convert Quote into a hashable tuple for set operations."""
-        return tuple(quote)
+    def is_stale(self, channel_id: int) -> bool:
+        """Check if a cached channel is older than `max_age` and not backing off a failed refresh (False if it isn't cached)."""
+        entry = self._channels.get(channel_id)
+        if entry is None:
+            return False
+        now = time.monotonic()
+        return now - entry.loaded_at > self.max_age and now >= entry.retry_at
 
-    def get_quote_history(self, daily=False) -> QuoteHistory:
+    def mark_fresh(self, channel_id: int):
+        """Reset a channel's age after it was brought up to date."""
+        entry = self._channels.get(channel_id)
+        if entry is not None:
+            entry.loaded_at = time.monotonic()
+            entry.refresh_failures = 0
+            entry.retry_at = 0.0
+
+    def mark_refresh_failed(self, channel_id: int):
+        """Back off before the next background refresh of a channel, longer with every failure in a row."""
+        entry = self._channels.get(channel_id)
+        if entry is not None:
+            delay = min(REFRESH_RETRY_DELAY * 2 ** entry.refresh_failures, self.max_age)
+            entry.refresh_failures += 1
+            entry.retry_at = time.monotonic() + delay
+
+    def replace_channel(self, entry: ChannelQuotes, keep_after: Optional[int] = None):
+        """
+        Swap a channel's cache for a freshly built one (see `ChannelQuotes.build()`) in one step,
+        so readers never see a half-built channel.
+
+        Args:
+            entry: The new cache of the channel, replacing the old one if it's cached
+            keep_after: Messages of the old cache newer than this ID are carried over
+                (e.g. ingested live while the rebuild was scanning)
+        """
+        channel_id = entry.channel_id
+        old = self._channels.get(channel_id)
+        if old is not None and keep_after is not None:
+            for message_id in old.columns.newer_than(keep_after):
+                if message_id not in entry.columns:
+                    entry.add(message_id, old.columns.get(message_id))
+            entry.resize()
+
+        self._drop(channel_id)
+        self._channels[channel_id] = entry
+        self._total_bytes += entry.size
+        self._evict(keep=channel_id)
+
+    def get_quote_history(self, channel_id: int, daily=False, guild_id: Optional[str] = None) -> QuoteView:
         """
-        Get cached quote history.
+        Get cached quote history of a channel, as a list-like QuoteView.
 
         - daily=False: return ALL cached history
-        - daily=True: return history excluding recent picks, avoiding repeated quotes
+        - daily=True: return history excluding the guild's recent daily quotes, avoiding repeated quotes
+
+        Recent picks are compared by their integer message IDs, no quotes are built or hashed.
+        Returns an empty view if the channel isn't cached.
+        """
+        entry = self._touch(channel_id)
+        if entry is None:
+            return QuoteView(QuoteColumns())
+
+        columns = entry.columns
+        if not daily or guild_id is None:
+            return QuoteView(columns)
 
-        This uses hashable keys from quote content and avoids O(n^2) loops.
+        recents = self.get_recent_dailies(guild_id)
+        message_ids = columns.message_ids
+        return QuoteView(columns, array("I", (msg for msg in columns.live if message_ids[msg] not in recents)))
+
+    def cache_quote_history(self, channel_id: int, messages: Iterable[QuoteMessage]):
+        """
+        Save (message_id, quote) pairs of a channel into the cache.
+        All given arguments will be added to the channel's cache, replacing messages with the same ID.
         """
-        if not daily:
-            return self._quote_history
+        entry = self._touch(channel_id)
+        if entry is None:
+            entry = ChannelQuotes(channel_id)
+            self._channels[channel_id] = entry
+            self._total_bytes += entry.size
+
+        new_ids = []
+        for message_id, quote in messages:
+            if entry.add(message_id, quote):
+                new_ids.append(message_id)
+        for bag in entry.bags.values():
+            bag.splice(new_ids)
 
-        recent_tuples = {self._quote_tuple(q) for q in self._recent_dailies}
-        return [q for q in self._quote_history if self._quote_tuple(q) not in recent_tuples]
+        self._total_bytes += entry.resize()
+        self._evict(keep=channel_id)
 
-    def cache_quote_history(self, all_quotes: QuoteHistory):
+    def remove_message(self, channel_id: int, message_id: int):
+        """Remove one message from a channel's cache, if both are cached."""
+        entry = self._channels.get(channel_id)
+        if entry is None:
+            return
+
+        entry.remove(message_id)
+        self._total_bytes += entry.resize()
+
+    def get_tally(self, channel_id: int) -> QuoteTally:
         """
-        Save quotes into the cache.
-        All given arguments will be appended to the cache.
+        Get the running leaderboard aggregates of a channel.
+        Returns an empty QuoteTally if the channel isn't cached.
         """
-        for quote in all_quotes:
-            self._quote_history.append(quote)
-    
-    def cache_recent_history(self, quote: Quote):
+        entry = self._touch(channel_id)
+        if entry is None:
+            return QuoteTally()
+
+        # account for PersonTallies the previous caller built on it
+        self._total_bytes += entry.resize()
+        self._evict(keep=channel_id)
+        return entry.tally
+
+    def pick_by_person(self, channel_id: int, guild_id: str, matcher: AliasMatcher, person: str) -> Optional[Quote]:
+        """
+        Draw a random quote of a channel in which `person` (a primary user of the guild) is quoted.
+        Returns None if the channel isn't cached or the person was never quoted.
+        """
+        entry = self._touch(channel_id)
+        if entry is None:
+            return None
+
+        message_id = entry.tally.random_message_of(guild_id, matcher, person)
+        self._total_bytes += entry.resize()
+        self._evict(keep=channel_id)
+        return entry.columns.get(message_id) if message_id is not None else None
+
+    async def index_channel(self, channel_id: int, executor: Optional[Executor] = None):
         """
-        Save a single quote into recent history (MRU queue).
+        Build the search index of a cached channel if it has none yet, in `executor` (the event loop
+        only copies the columns and replays the changes made meanwhile). Concurrent calls share one build.
+        """
+        entry = self._channels.get(channel_id)
+        if entry is None or entry.index is not None:
+            return
+
+        if entry.indexing is None:
+            columns = entry.start_indexing()
+            entry.indexing = asyncio.get_running_loop().run_in_executor(executor, SearchIndex.build, columns)
+        indexing = entry.indexing
+
+        try:
+            index = await asyncio.shield(indexing)
+        except Exception:
+            if entry.indexing is indexing:
+                entry.index_log = entry.indexing = None
+            raise
+
+        # the first caller to get here installs it, the channel may have been evicted or rebuilt meanwhile
+        if entry.indexing is indexing and self._channels.get(channel_id) is entry:
+            entry.finish_indexing(index)
+            self._total_bytes += entry.resize()
+            self._evict(keep=channel_id)
+
+    def search(self, channel_id: int, query: str, limit: int = 100) -> list[tuple[int, Quote]]:
+        """
+        Full-text search over the quote texts and authors of a channel.
+        Builds the search index right here if `index_channel()` wasn't awaited first.
+
+        Returns:
+            list[tuple[int, Quote]]: (message_id, quote) pairs, best match first.
+            Empty if the channel isn't cached or nothing matches.
+        """
+        entry = self._touch(channel_id)
+        if entry is None:
+            return []
+
+        if entry.index is None:
+            entry.index = SearchIndex.build(entry.columns)
+            entry.index_log = entry.indexing = None
+            self._total_bytes += entry.resize()
+
+        results = []
+        for message_id, _ in entry.index.search(query, limit):
+            quote = entry.columns.get(message_id)
+            if quote is not None:
+                results.append((message_id, quote))
+        return results
 
-        The most recent quote is index 0. The list stays unique and capped at _recents_size.
+    def pick_random(self, channel_id: int, guild_id: str, daily: bool = False) -> Optional[Quote]:
         """
-        self._recent_dailies.insert(0, quote)
-        self._recent_dailies.pop()
+        Draw a random quote of a channel for a guild, without repeating until the guild has seen them all.
+
+        With daily=True the pick also skips the guild's recent daily quotes and is recorded as one.
+        Returns None if the channel isn't cached or has no quotes.
+        """
+        entry = self._touch(channel_id)
+        if entry is None:
+            return None
+
+        recents = self.get_recent_dailies(guild_id)
+        bag = entry.bags.get(guild_id)
+        if bag is None:
+            saved = self.store.call(self.store.load_bag, guild_id) if self.store is not None else None
+            bag = ShuffleBag.load(guild_id, entry.columns, channel_id, recents, self.store, saved)
+            entry.bags[guild_id] = bag
+
+        # the bag is refilled without recents, so this only loops for quotes that became recent mid-round
+        for _ in range(len(bag) + 1):
+            message_id = bag.pick(entry.columns)
+            if message_id is None:
+                return None
+            if not daily or message_id not in recents:
+                break
+
+        if daily:
+            self.cache_recent_history(guild_id, message_id)
+        return entry.columns.get(message_id)
+
+    async def load_guild(self, channel_id: int, guild_id: str):
+        """
+        Load a guild's recent daily quotes and its shuffle bag for a cached channel from the QuoteStore,
+        on the store's thread. `pick_random()` loads whatever is missing itself, but blocking.
+        """
+        if self.store is None:
+            return
+
+        if guild_id not in self._recent_dailies:
+            saved = await self.store.run(self.store.load_recents, guild_id, self._recents_size)
+            self._recent_dailies.setdefault(guild_id, RecentDailies(self._recents_size, saved))
+
+        entry = self._channels.get(channel_id)
+        if entry is None or guild_id in entry.bags:
+            return
+
+        saved_bag = await self.store.run(self.store.load_bag, guild_id)
+        # the channel may have been evicted or rebuilt meanwhile
+        entry = self._channels.get(channel_id)
+        if entry is not None and guild_id not in entry.bags:
+            recents = self._recent_dailies[guild_id]
+            entry.bags[guild_id] = ShuffleBag.load(guild_id, entry.columns, channel_id, recents, self.store, saved_bag)
+
+    def get_recent_dailies(self, guild_id: str) -> RecentDailies:
+        """Get a guild's recent daily quotes, loading them from the QuoteStore the first time (see `load_guild()`)."""
+        recents = self._recent_dailies.get(guild_id)
+        if recents is None:
+            saved = self.store.call(self.store.load_recents, guild_id, self._recents_size) if self.store is not None else []
+            recents = RecentDailies(self._recents_size, saved)
+            self._recent_dailies[guild_id] = recents
+        return recents
+
+    def cache_recent_history(self, guild_id: str, message_id: int):
+        """
+        Save a single daily quote (by message ID) into a guild's recent history.
+
+        Kept in a ring buffer capped at _recents_size, persisted in the QuoteStore if there is one.
+        """
+        self.get_recent_dailies(guild_id).add(message_id)
+        if self.store is not None:
+            self.store.submit(self.store.add_recent, guild_id, message_id, self._recents_size)
 
     def edit_recents_size(self, size: int):
         """
@@ -58,11 +442,30 @@ class QuoteCache:
         If recents are reduced, older entries are dropped to conform to new size.
         """
         self._recents_size = size
-        while len(self._recent_dailies) > self._recents_size:
-            self._recent_dailies.pop()
+        for recents in self._recent_dailies.values():
+            recents.resize(size)
+
+    def memory_usage(self) -> int:
+        """Approximate number of bytes used by all cached channels."""
+        return self._total_bytes
+
+    def channel_memory_usage(self, channel_id: int) -> int:
+        """Approximate number of bytes used by one channel, 0 if it isn't cached."""
+        entry = self._channels.get(channel_id)
+        return entry.size if entry is not None else 0
 
-    def clear_cache(self):
+    def cached_channels(self) -> int:
+        return len(self._channels)
+
+    def clear_cache(self, channel_id: Optional[int] = None):
         """
-        Delete all cache.
+        Delete the cache of one channel, or of every channel (and all recent daily quotes) if no ID is given.
+        The QuoteStore is left alone, so a dropped channel is reloaded from disk on its next use.
         """
-        self._quote_history.clear()
\ No newline at end of file
+        if channel_id is not None:
+            self._drop(channel_id)
+            return
+
+        self._channels.clear()
+        self._total_bytes = 0
+        self._recent_dailies.clear()
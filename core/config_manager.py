@@ -1,15 +1,18 @@
 # ========== Imports ==========
 import os
 import json
+import asyncio
+import tempfile
 import dotenv
 dotenv.load_dotenv()
 from typing import Optional
 
-from core.models import GuildConfig
+from core.models import GuildConfig, DEFAULT_POST_TIME, DEFAULT_TIMEZONE
 
 
 # ========== Constants ==========
 FILE = "data/config.json"
+SAVE_DELAY = 2.0    # seconds, write-behind saves within this window are coalesced into one write
 
 
 # ========== Class ConfigManager ==========
@@ -23,9 +26,15 @@ class ConfigManager:
         `add_guild()`: Add a new guild with default configuration
         `remove_guild()`: Remove a guild's configuration
         `save()`: Save changes to config.json
+        `flush()` / `save_now()`: Write pending changes immediately (async / blocking)
     
     **IMPORTANT**
         Whenever you're editing or adding to the config you're forced to use the `save()` function or else your changes won't go through!!
+
+    With `write_behind=True`, `save()` only marks the config dirty. Saves within `save_delay` seconds
+    are coalesced into one write, which is serialized in an executor so the event loop doesn't block.
+    Writes always go to a temp file that is renamed over config.json, so a crash can't leave half a file.
+    Call `save_now()` on shutdown to flush whatever is still pending.
     
     {
     "guilds": {
@@ -33,17 +42,26 @@ class ConfigManager:
         "source_channel": 789,
         "target_channel": 101,
         "authorized_users": ["123"],
-        "admin" : 123
+        "admin" : 123,
+        "post_time": "09:00",
+        "timezone": "Europe/Brussels"
         }
       }
     }
     """
 
 
-    def __init__(self):
+    def __init__(self, write_behind: bool = False, save_delay: float = SAVE_DELAY):
         self.path = FILE
         self.data = self._load()
 
+        self.write_behind = write_behind
+        self.save_delay = save_delay
+        self._dirty = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
     def _load(self) -> dict:
         """Load configuration from JSON file."""
         if not os.path.exists(self.path):
@@ -58,10 +76,79 @@ class ConfigManager:
         
         return data
 
+    def _serialize(self) -> str:
+        return json.dumps(self.data, indent=4)
+
+    def _write(self, content: str):
+        """Atomically replace the config file with `content` (temp file + rename)."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+
+        f = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False)
+        try:
+            with f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(f.name, self.path)
+        except BaseException:
+            # e.g. the disk is full, don't leave the half written temp file behind
+            try:
+                os.remove(f.name)
+            except OSError:
+                pass
+            raise
+
     def save(self):
-        """Saves the changes made to the config file."""
-        with open(self.path, 'w', encoding="utf-8") as f:
-            json.dump(self.data, f, indent=4)
+        """Saves the changes made to the config file (or schedules it, in write-behind mode)."""
+        if not self.write_behind:
+            self._write(self._serialize())
+            return
+
+        self._dirty = True
+        if self._flush_handle is not None:
+            return      # a write is already coming up, it will include these changes
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # not running inside the bot, nothing to defer to
+            self.save_now()
+            return
+
+        self._flush_handle = loop.call_later(self.save_delay, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        """
+        Write pending changes now, off the event loop.
+
+        The config is serialized here on the loop, so commands changing it meanwhile can't tear
+        the snapshot, only the file write runs in the executor. If it fails, the changes stay
+        pending and the write is retried after `save_delay`.
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            content = self._serialize()
+            self._dirty = False
+
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, content)
+            except Exception as e:
+                print(f"Saving {self.path} failed, retrying later: {e!r}")
+                self.save()
+
+    def save_now(self):
+        """Cancel any pending write-behind save and write immediately. Used on shutdown."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        self._dirty = False
+        self._write(self._serialize())
     
     def get_guild(self, guild_id: int) -> GuildConfig:
         """Returns GuildConfig, creates default if missing (using add_guild method)."""
@@ -88,7 +175,9 @@ class ConfigManager:
             "target_channel" : None,
             "authorized_users" : [int(admin_id)],
             "admin" : int(admin_id),
-            "known_users" : {}
+            "known_users" : {},
+            "post_time" : DEFAULT_POST_TIME,
+            "timezone" : DEFAULT_TIMEZONE
         })
     
     def remove_guild(self, guild_id: int) -> bool:
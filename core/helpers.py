@@ -1,40 +1,180 @@
+import asyncio
+import datetime
+import time
 from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
 from core.models import GuildConfig
+from core.metrics import metrics
 import discord
 
+
+# ========== Constants ==========
+CHANNEL_TTL = 300.0     # seconds a fetched (or missing) channel is remembered
+
+
+# ========== ChannelResolver Class ==========
+class ChannelResolver:
+    """
+    Turns channel IDs into Discord channel objects with as few REST calls as possible.
+
+    1. The gateway cache (`client.get_channel`) is always tried first, it costs nothing.
+    2. Channels that had to be fetched over REST are remembered for `ttl` seconds,
+       and so are channels that couldn't be fetched (negative results).
+    3. On a miss, the source and target channel are fetched concurrently.
+
+    Call `invalidate()` when a channel changes or gets deleted.
+    """
+
+    def __init__(self, ttl: float = CHANNEL_TTL):
+        self.ttl = ttl
+        self._entries: dict[int, tuple[float, Optional[discord.abc.Snowflake]]] = {}    # channel_id -> (expires_at, channel)
+
+    def _cached(self, channel_id: int):
+        """Return (hit, channel) from the TTL cache."""
+        entry = self._entries.get(channel_id)
+        if entry is None:
+            return False, None
+
+        expires_at, channel = entry
+        if expires_at < time.monotonic():
+            del self._entries[channel_id]
+            return False, None
+
+        return True, channel
+
+    async def _fetch(self, client: discord.Client, channel_id: int):
+        try:
+            channel = await client.fetch_channel(channel_id)
+        except (discord.InvalidData, discord.Forbidden, discord.NotFound):
+            channel = None
+
+        self._entries[channel_id] = (time.monotonic() + self.ttl, channel)
+        return channel
+
+    async def resolve(self, client: discord.Client, channel_id: int):
+        """Return the channel object, or None if it doesn't exist or can't be accessed."""
+        return (await self.resolve_many(client, channel_id))[0]
+
+    async def resolve_many(self, client: discord.Client, *channel_ids: int) -> list:
+        """Resolve several channels at once, fetching every miss concurrently."""
+        channels: list = [None] * len(channel_ids)
+        misses: list[int] = []
+
+        for index, channel_id in enumerate(channel_ids):
+            channel = client.get_channel(channel_id)
+            if channel is not None:
+                metrics.inc("channel_resolver_total", result="gateway")
+            else:
+                hit, channel = self._cached(channel_id)
+                metrics.inc("channel_resolver_total", result="ttl" if hit else "fetch")
+                if not hit:
+                    misses.append(index)
+            channels[index] = channel
+
+        if misses:
+            fetched = await asyncio.gather(*(self._fetch(client, channel_ids[index]) for index in misses))
+            for index, channel in zip(misses, fetched):
+                channels[index] = channel
+
+        return channels
+
+    def invalidate(self, *channel_ids: Optional[int]):
+        """Forget the given channels, e.g. after /source, /target or a channel delete."""
+        for channel_id in channel_ids:
+            if channel_id is not None:
+                self._entries.pop(channel_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+channel_resolver = ChannelResolver()
+
+
+# ========== Helper Functions ==========
 async def get_configured_channels(
     guild_config: GuildConfig,
     client: discord.Client
 ) -> Optional[Tuple[discord.TextChannel, discord.abc.Messageable]]:
     """
     Get source and target channels as Discord objects.
-    
+    Uses the shared ChannelResolver, so most calls don't hit the REST API.
+
     Args:
         guild_config: GuildConfig instance
         client: Discord client (from interaction.client)
-    
+
     Returns:
         (source_channel, target_channel) or None if not configured/invalid
     """
     source_id = guild_config.source_channel
     target_id = guild_config.target_channel
-    
+
     # Check if configured
     if source_id is None or target_id is None:
         return None
-    
-    # Fetch channels with error handling
-    try:
-        source_channel = await client.fetch_channel(source_id)
-        target_channel = await client.fetch_channel(target_id)
-    except (discord.InvalidData, discord.Forbidden, discord.NotFound):
-        return None
-    
+
+    # Resolve channels (gateway cache, TTL cache, then REST)
+    source_channel, target_channel = await channel_resolver.resolve_many(client, source_id, target_id)
+
     # Type validation
     if not isinstance(source_channel, discord.TextChannel):
         return None
-    
+
     if not isinstance(target_channel, discord.abc.Messageable):
         return None
-    
-    return source_channel, target_channel
\ No newline at end of file
+
+    return source_channel, target_channel
+
+
+def window_bounds(
+    window: str,
+    zone: ZoneInfo,
+    now: Optional[datetime.datetime] = None
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Get the snowflake range of a leaderboard time window, in the guild's timezone.
+
+    Args:
+        window: "all", "week" (since Monday), "month" (since the 1st) or "year" (since January 1st)
+        zone: Timezone of the guild
+        now: Current time, defaults to now
+
+    Returns:
+        (start_id, end_id) usable with QuoteTally, None meaning unbounded
+    """
+    now = (now or discord.utils.utcnow()).astimezone(zone)
+    today = datetime.datetime.combine(now.date(), datetime.time(), tzinfo=zone)
+
+    match window:
+        case "week":
+            start = today - datetime.timedelta(days=today.weekday())
+        case "month":
+            start = today.replace(day=1)
+        case "year":
+            start = today.replace(month=1, day=1)
+        case _:
+            return None, None
+
+    return discord.utils.time_snowflake(start), None
+
+
+def parse_date_range(start: str, end: str, zone: ZoneInfo) -> Tuple[int, int]:
+    """
+    Turn a "YYYY-MM-DD" to "YYYY-MM-DD" range (both days included) into a snowflake range.
+
+    Raises:
+        ValueError: if a date is invalid or the range is empty
+    """
+    try:
+        start_date = datetime.date.fromisoformat(start.strip())
+        end_date = datetime.date.fromisoformat(end.strip())
+    except ValueError:
+        raise ValueError("Dates must look like YYYY-MM-DD (e.g. 2024-01-31)")
+
+    if end_date < start_date:
+        raise ValueError("The end date is before the start date")
+
+    start_at = datetime.datetime.combine(start_date, datetime.time(), tzinfo=zone)
+    end_at = datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time(), tzinfo=zone)
+    return discord.utils.time_snowflake(start_at), discord.utils.time_snowflake(end_at)
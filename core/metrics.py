@@ -0,0 +1,201 @@
+# ========== Imports ==========
+import os
+import tempfile
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+
+# ========== Constants ==========
+METRICS_FILE = "data/metrics.prom"
+DUMP_INTERVAL = 60.0        # seconds between Prometheus file dumps
+
+# upper bounds in seconds, the last bucket (+Inf) is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+# ========== Histogram Class ==========
+class Histogram:
+    """Fixed-bucket latency histogram, the same layout Prometheus uses."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)       # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket (like Prometheus' histogram_quantile)."""
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for index, amount in enumerate(self.counts):
+            if seen + amount >= rank and amount:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                return lower + (self.bounds[index] - lower) * (rank - seen) / amount
+            seen += amount
+        return self.bounds[-1]
+
+
+# ========== MetricsRegistry Class ==========
+class MetricsRegistry:
+    """
+    Lightweight in-process metrics: counters, gauges and latency histograms, all with labels.
+
+    Everything is a plain dict update, cheap enough to call on every command and phase.
+    Gauges that describe current state (e.g. cache size per guild) are filled by collectors,
+    functions registered with `add_collector()` that run right before metrics are read.
+
+    *Functions*:
+        `inc()`: Add to a counter
+        `set_gauge()` / `reset()`: Set a gauge, or forget every series of a metric
+        `observe()` / `timer()`: Record a duration in a histogram
+        `render_prometheus()` / `write_prometheus()`: Prometheus text format, as string or file
+        `summary()`: Short human readable overview
+    """
+
+    def __init__(self):
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._gauges: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, Histogram]] = {}
+        self._collectors: list[Callable[["MetricsRegistry"], None]] = []
+
+    @staticmethod
+    def _labels(labels: dict) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    # ---------- Recording ----------
+    def inc(self, name: str, amount: float = 1, **labels):
+        series = self._counters.setdefault(name, {})
+        key = self._labels(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self._gauges.setdefault(name, {})[self._labels(labels)] = value
+
+    def reset(self, name: str):
+        """Forget every series of a gauge (e.g. before a collector sets the current ones)."""
+        self._gauges.pop(name, None)
+
+    def observe(self, name: str, seconds: float, **labels):
+        series = self._histograms.setdefault(name, {})
+        key = self._labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Time the body of a `with` block (works around awaits too) into a histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def add_collector(self, collector: Callable[["MetricsRegistry"], None]):
+        self._collectors.append(collector)
+
+    def collect(self):
+        for collector in self._collectors:
+            try:
+                collector(self)
+            except Exception as exc:
+                print(f"Metrics collector failed: {exc!r}")
+
+    # ---------- Reading ----------
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get(name, {}).get(self._labels(labels), 0)
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self._histograms.get(name, {}).get(self._labels(labels))
+
+    @staticmethod
+    def _format(name: str, labels: Labels, extra: Labels = ()) -> str:
+        pairs = labels + extra
+        if not pairs:
+            return name
+
+        def escape(value: str) -> str:
+            return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+        return name + "{" + ",".join(f'{key}="{escape(value)}"' for key, value in pairs) + "}"
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        self.collect()
+        lines: list[str] = []
+
+        for kind, family in (("counter", self._counters), ("gauge", self._gauges)):
+            for name, series in sorted(family.items()):
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{self._format(name, labels)} {value:g}")
+
+        for name, series in sorted(self._histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, amount in zip(histogram.bounds + (float("inf"),), histogram.counts):
+                    cumulative += amount
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{self._format(name + '_bucket', labels, (('le', le),))} {cumulative}")
+                lines.append(f"{self._format(name + '_sum', labels)} {histogram.sum:g}")
+                lines.append(f"{self._format(name + '_count', labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str = METRICS_FILE):
+        """Atomically write the Prometheus text to `path`, so a scraper never reads half a file."""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render_prometheus())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def summary(self) -> str:
+        """Latency percentiles and counters, short enough for a Discord message."""
+        self.collect()
+        lines: list[str] = []
+
+        for name, series in sorted(self._histograms.items()):
+            lines.append(f"{name}")
+            for labels, histogram in sorted(series.items()):
+                label_text = ",".join(value for _, value in labels) or "-"
+                lines.append(
+                    f"  {label_text:<18} n={histogram.count:<6} "
+                    f"p50={histogram.quantile(0.5) * 1000:.0f}ms p95={histogram.quantile(0.95) * 1000:.0f}ms"
+                )
+
+        for family in (self._counters, self._gauges):
+            for name, series in sorted(family.items()):
+                values = ", ".join(
+                    f"{','.join(value for _, value in labels) or name}={value:g}" for labels, value in sorted(series.items())
+                )
+                lines.append(f"{name}: {values}")
+
+        return "\n".join(lines) or "No metrics recorded yet."
+
+
+metrics = MetricsRegistry()
@@ -3,6 +3,11 @@ from typing import Optional
 import discord
 
 
+# ========== Constants ==========
+DEFAULT_POST_TIME = "09:00"     # HH:MM, local to the guild's timezone
+DEFAULT_TIMEZONE = "UTC"
+
+
 # ========== GuildConfig Model ==========
 class GuildConfig:
     """
@@ -54,6 +59,26 @@ class GuildConfig:
         """Get the superior admin sigma as a str."""
         return self._data.get("admin")
     
+    @property
+    def post_time(self) -> str:
+        """Get the daily quote time as "HH:MM" in the guild's timezone."""
+        return self._data.get("post_time", DEFAULT_POST_TIME)
+
+    @post_time.setter
+    def post_time(self, value: str):
+        """Set the daily quote time ("HH:MM")."""
+        self._data["post_time"] = value
+
+    @property
+    def timezone(self) -> str:
+        """Get the IANA timezone name of the guild (e.g. "Europe/Brussels")."""
+        return self._data.get("timezone", DEFAULT_TIMEZONE)
+
+    @timezone.setter
+    def timezone(self, value: str):
+        """Set the IANA timezone name of the guild."""
+        self._data["timezone"] = value
+
     @property
     def known_users(self) -> dict[str, list[str]]:
         """Get the known users mapping: Primary -> [aliases]"""
@@ -0,0 +1,231 @@
+# ========== Imports ==========
+import copy
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterator, Optional, Sequence
+
+from my_types.quote_types import Quote
+
+
+# ========== Size Estimation ==========
+_AUTHOR_ENTRY_SIZE = 100    # rough cost of one interned author in the lookup dict and table
+_LIST_SLOT_SIZE = 8
+
+
+# ========== QuoteColumns Class ==========
+class QuoteColumns:
+    """
+    Compact, column-oriented storage of the quotes of one channel.
+
+    Instead of a list per message holding a tuple per quote line, everything sits in flat columns:
+
+    - every message gets a small integer ID (its row in the message columns)
+      `message_ids`, `sender_ids` (array('Q')), `first_line`, `line_count` (array('I'))
+    - quote texts are UTF-8 encoded back to back in one bytearray, `text_offsets` marks where each line starts
+    - author strings are interned in one table (`authors`), lines only store an array('I') index
+    - Discord message IDs are looked up with a binary search over a sorted array('Q') instead of a dict
+
+    `live` holds the integer IDs of messages that still exist and `live_pos` the position of every
+    message in it (-1 once removed), so removing is a swap with the last element.
+    Removed and edited messages leave dead rows behind until `compact()` rebuilds the columns.
+
+    Use `quote()` / `get()` to get a regular Quote back.
+    """
+
+    def __init__(self):
+        # line columns
+        self.text_data = bytearray()
+        self.text_offsets = array("Q", [0])
+        self.author_ids = array("I")
+
+        # interned author strings
+        self.authors: list[str] = []
+        self._author_lookup: dict[str, int] = {}
+
+        # message columns
+        self.message_ids = array("Q")
+        self.sender_ids = array("Q")
+        self.first_line = array("I")
+        self.line_count = array("I")
+
+        self.live = array("I")
+        self.live_pos = array("q")
+
+        # sorted discord message ids -> message int (-1 once removed)
+        self._keys = array("Q")
+        self._key_msgs = array("q")
+
+        self._author_bytes = 0
+        self.dead_lines = 0
+
+    def __len__(self) -> int:
+        return len(self.live)
+
+    def _intern(self, author: str) -> int:
+        author_id = self._author_lookup.get(author)
+        if author_id is None:
+            author_id = len(self.authors)
+            self.authors.append(author)
+            self._author_lookup[author] = author_id
+            self._author_bytes += sys.getsizeof(author) + _AUTHOR_ENTRY_SIZE
+        return author_id
+
+    def _key_pos(self, message_id: int) -> int:
+        """Position of `message_id` in the sorted keys, or -1."""
+        pos = bisect_left(self._keys, message_id)
+        if pos < len(self._keys) and self._keys[pos] == message_id:
+            return pos
+        return -1
+
+    # ---------- Reading ----------
+    def text(self, line: int) -> str:
+        return self.text_data[self.text_offsets[line]:self.text_offsets[line + 1]].decode("utf-8")
+
+    def quote(self, msg: int) -> Quote:
+        """Build the Quote of a message int."""
+        start = self.first_line[msg]
+        sender_id = self.sender_ids[msg]
+        return [
+            (self.text(line), self.authors[self.author_ids[line]], sender_id)
+            for line in range(start, start + self.line_count[msg])
+        ]
+
+    def find(self, message_id: int) -> Optional[int]:
+        """Return the message int of a Discord message ID, or None if it isn't stored."""
+        pos = self._key_pos(message_id)
+        if pos == -1 or self._key_msgs[pos] == -1:
+            return None
+        return self._key_msgs[pos]
+
+    def get(self, message_id: int) -> Optional[Quote]:
+        """Return the Quote of a Discord message ID, or None if it isn't stored."""
+        msg = self.find(message_id)
+        return None if msg is None else self.quote(msg)
+
+    def __contains__(self, message_id: int) -> bool:
+        return self.find(message_id) is not None
+
+    def copy(self) -> "QuoteColumns":
+        """Independent copy of the columns (C level copies of the arrays), e.g. to read them in another thread."""
+        clone = QuoteColumns.__new__(QuoteColumns)
+        clone.__dict__.update({name: copy.copy(value) for name, value in self.__dict__.items()})
+        return clone
+
+    def newer_than(self, message_id: int) -> list[int]:
+        """Discord message IDs of the stored messages newer than `message_id`, oldest first."""
+        pos = bisect_left(self._keys, message_id + 1)
+        return [self._keys[i] for i in range(pos, len(self._keys)) if self._key_msgs[i] != -1]
+
+
+    def nbytes(self) -> int:
+        """Approximate amount of memory used by the columns."""
+        arrays = (
+            self.text_offsets, self.author_ids, self.message_ids, self.sender_ids, self.first_line,
+            self.line_count, self.live, self.live_pos, self._keys, self._key_msgs
+        )
+        return (
+            sum(column.itemsize * len(column) for column in arrays)
+            + len(self.text_data)
+            + self._author_bytes + len(self.authors) * _LIST_SLOT_SIZE
+        )
+
+    # ---------- Writing ----------
+    def add(self, message_id: int, quote: Quote) -> int:
+        """Append a message (replacing it if it's already stored). Returns its message int."""
+        self.remove(message_id)
+
+        msg = len(self.message_ids)
+        self.message_ids.append(message_id)
+        self.sender_ids.append(quote[0][2] if quote else 0)
+        self.first_line.append(len(self.author_ids))
+        self.line_count.append(len(quote))
+
+        for text, author, _ in quote:
+            self.text_data += text.encode("utf-8")
+            self.text_offsets.append(len(self.text_data))
+            self.author_ids.append(self._intern(author))
+
+        self.live_pos.append(len(self.live))
+        self.live.append(msg)
+
+        # new messages nearly always have the highest ID, so this is an append
+        pos = self._key_pos(message_id)
+        if pos != -1:
+            self._key_msgs[pos] = msg
+        elif not self._keys or self._keys[-1] < message_id:
+            self._keys.append(message_id)
+            self._key_msgs.append(msg)
+        else:
+            pos = bisect_left(self._keys, message_id)
+            self._keys.insert(pos, message_id)
+            self._key_msgs.insert(pos, msg)
+
+        return msg
+
+    def remove(self, message_id: int) -> Optional[Quote]:
+        """Remove a message. Returns its Quote, or None if it wasn't stored."""
+        pos = self._key_pos(message_id)
+        if pos == -1 or self._key_msgs[pos] == -1:
+            return None
+
+        msg = self._key_msgs[pos]
+        self._key_msgs[pos] = -1
+        quote = self.quote(msg)
+
+        # swap the last live message into the hole
+        live_pos = self.live_pos[msg]
+        last = self.live.pop()
+        if last != msg:
+            self.live[live_pos] = last
+            self.live_pos[last] = live_pos
+        self.live_pos[msg] = -1
+
+        self.dead_lines += self.line_count[msg]
+        return quote
+
+    def needs_compaction(self) -> bool:
+        return self.dead_lines > 1024 and self.dead_lines > len(self.author_ids) // 2
+
+    def compact(self):
+        """Rebuild the columns without dead rows. Message ints change, Discord message IDs don't."""
+        fresh = QuoteColumns()
+        for msg in sorted(self.live, key=lambda msg: self.message_ids[msg]):
+            fresh.add(self.message_ids[msg], self.quote(msg))
+        self.__dict__.update(fresh.__dict__)
+
+
+# ========== QuoteView Class ==========
+class QuoteView(Sequence):
+    """
+    Read-only list-like view over (a selection of) the messages in QuoteColumns.
+    Quotes are built on demand, so existing callers keep working with regular Quote lists.
+    """
+
+    def __init__(self, columns: QuoteColumns, msgs: Optional[array] = None):
+        self._columns = columns
+        self._msgs = msgs
+
+    def _selection(self) -> array:
+        return self._columns.live if self._msgs is None else self._msgs
+
+    def __len__(self) -> int:
+        return len(self._selection())
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._columns.quote(msg) for msg in self._selection()[position]]
+        return self._columns.quote(self._selection()[position])
+
+    def __iter__(self) -> Iterator[Quote]:
+        for msg in self._selection():
+            yield self._columns.quote(msg)
+
+    def message_id(self, position: int) -> int:
+        """Discord message ID of the quote at `position`."""
+        return self._columns.message_ids[self._selection()[position]]
+
+    def line_count(self) -> int:
+        """Total amount of quote lines, without building any Quote."""
+        line_count = self._columns.line_count
+        return sum(line_count[msg] for msg in self._selection())
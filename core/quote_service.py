@@ -3,9 +3,11 @@ from typing import Optional, Tuple
 
 from core.cache import QuoteCache
 from core.helpers import get_configured_channels
+from core.metrics import metrics
 from core.models import GuildConfig
 from quotes.embeds import create_quote_embed
-from quotes.fetcher import fetch_random_quote
+from quotes.fetcher import fetch_random_quote, fetch_random_quote_by_person
+from core.alias_matcher import get_alias_matcher
 from my_types.quote_types import Quote
 
 
@@ -13,34 +15,93 @@ async def fetch_random_quote_for_guild(
     guild_data: GuildConfig,
     client: discord.Client,
     cache: QuoteCache,
+    daily: bool = False,
+    person: Optional[str] = None,
 ) -> Optional[Tuple[discord.TextChannel, discord.abc.Messageable, Quote]]:
     """Return a ready-to-send random quote for a guild.
 
     The caller is responsible for validating configuration and handling
     the case where there are no quotes or channels are unavailable.
+    With daily=True, the guild's recent daily quotes are skipped and the pick is recorded as one.
+    With a person (primary user name), only quotes of that person are drawn.
     """
-    channels = await get_configured_channels(guild_data, client)
+    with metrics.timer("phase_seconds", phase="resolve"):
+        channels = await get_configured_channels(guild_data, client)
     if channels is None:
         return None
 
     source_channel, target_channel = channels
-    quote = await fetch_random_quote(source_channel, cache)
+    if person is not None:
+        quote = await fetch_random_quote_by_person(source_channel, cache, get_alias_matcher(guild_data), person)
+    else:
+        quote = await fetch_random_quote(source_channel, cache, daily)
     if quote is None:
         return None
 
     return source_channel, target_channel, quote
 
 
+def can_post_in(target_channel: discord.abc.Messageable) -> bool:
+    """Check that the bot may send embeds in the target channel (always True outside of guilds)."""
+    guild = getattr(target_channel, "guild", None)
+    if guild is None or not hasattr(target_channel, "permissions_for"):
+        return True
+
+    permissions = target_channel.permissions_for(guild.me)
+    if isinstance(target_channel, discord.Thread):
+        can_send = permissions.send_messages_in_threads
+    else:
+        can_send = permissions.send_messages
+    return can_send and permissions.embed_links
+
+
+async def prepare_daily_quote_for_guild(
+    guild_data: GuildConfig,
+    client: discord.Client,
+    cache: QuoteCache,
+) -> Optional[Tuple[discord.abc.Messageable, discord.Embed]]:
+    """Do all the work of a daily quote except sending it.
+
+    Resolves and validates the channels, refreshes the quote history if needed,
+    picks the quote (recording it as a daily quote) and renders the embed.
+
+    Returns:
+        (target_channel, embed), or None if there is nothing to post or the bot can't post in the target
+    """
+    with metrics.timer("phase_seconds", phase="resolve"):
+        channels = await get_configured_channels(guild_data, client)
+    if channels is None:
+        return None
+
+    source_channel, target_channel = channels
+    if not can_post_in(target_channel):
+        return None
+
+    quote = await fetch_random_quote(source_channel, cache, daily=True)
+    if quote is None:
+        return None
+
+    with metrics.timer("phase_seconds", phase="embed"):
+        embed = create_quote_embed(quote)
+    return target_channel, embed
+
+
+async def send_prepared_quote(prepared: Tuple[discord.abc.Messageable, discord.Embed]) -> bool:
+    """Send a quote made by `prepare_daily_quote_for_guild()`."""
+    target_channel, embed = prepared
+    with metrics.timer("phase_seconds", phase="send"):
+        await target_channel.send(embed=embed)
+    return True
+
+
 async def send_random_quote_for_guild(
     guild_data: GuildConfig,
     client: discord.Client,
     cache: QuoteCache,
 ) -> bool:
-    """Send a random quote to the configured target channel."""
-    result = await fetch_random_quote_for_guild(guild_data, client, cache)
-    if result is None:
+    """Send the daily random quote to the configured target channel."""
+    prepared = await prepare_daily_quote_for_guild(guild_data, client, cache)
+    if prepared is None:
         return False
 
-    _, target_channel, quote = result
-    await target_channel.send(embed=create_quote_embed(quote))
-    return True
+    return await send_prepared_quote(prepared)
@@ -0,0 +1,318 @@
+# ========== Imports ==========
+import asyncio
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Optional
+
+from my_types.quote_types import QuoteMessage
+
+
+# ========== Constants ==========
+DB_FILE = "data/quotes.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id      INTEGER PRIMARY KEY,
+    last_message_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS quotes (
+    channel_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    position   INTEGER NOT NULL,
+    quote      TEXT    NOT NULL,
+    author     TEXT    NOT NULL,
+    sender_id  INTEGER NOT NULL,
+    PRIMARY KEY (channel_id, message_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS backfill_ranges (
+    channel_id  INTEGER NOT NULL,
+    range_index INTEGER NOT NULL,
+    after_id    INTEGER NOT NULL,
+    before_id   INTEGER,
+    done        INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (channel_id, range_index)
+);
+
+CREATE TABLE IF NOT EXISTS shuffle_bags (
+    guild_id        TEXT PRIMARY KEY,
+    channel_id      INTEGER NOT NULL,
+    last_message_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS recent_dailies (
+    guild_id   TEXT    NOT NULL,
+    seq        INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, seq)
+);
+
+CREATE TABLE IF NOT EXISTS shuffle_bag_entries (
+    guild_id   TEXT    NOT NULL,
+    message_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, message_id)
+);
+"""
+
+
+# ========== QuoteStore Class ==========
+class QuoteStore:
+    """
+    On-disk store of parsed quotes, kept per source channel.
+
+    Next to the quotes themselves it remembers the last message ID that was ingested
+    for every channel (the "high-water mark"). The fetcher uses it to only ask Discord
+    for `history(after=last_id)` instead of rescanning the whole channel on every start.
+
+    *Functions*:
+        `load_channel()`: Get all stored quotes of a channel, oldest message first
+        `last_message_id()`: Get the high-water mark of a channel
+        `save_messages()`: Store newly parsed messages and move the high-water mark
+        `delete_message()`: Forget the quotes of a deleted message
+        `clear_channel()`: Forget everything stored for a channel
+        `load_ranges()` / `plan_ranges()` / `save_range()` / `finish_ranges()`: Track a parallel backfill
+        `load_bag()` / `fill_bag()` / `take_from_bag()` / `add_to_bag()`: Persist a guild's ShuffleBag
+        `load_recents()` / `add_recent()`: Persist a guild's RecentDailies
+
+    SQLite calls block on disk, so the bot never makes them on the event loop. Every method runs on
+    the store's own thread instead, through `run()` (awaited) or `submit()` (queued without waiting,
+    for code that can't await). A single thread runs everything in the order it was queued,
+    so a read always sees the writes queued before it.
+    """
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quote-store")
+
+    # ---------- Threading ----------
+    async def run(self, method: Callable, *args) -> Any:
+        """Run a store method on the store's thread and wait for its result."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, method, *args)
+
+    def submit(self, method: Callable, *args) -> Future:
+        """Queue a store method on the store's thread without waiting for it. Failures are logged."""
+        future = self._executor.submit(method, *args)
+        future.add_done_callback(_log_failure)
+        return future
+
+    def call(self, method: Callable, *args) -> Any:
+        """Run a store method on the store's thread and block until it's done, for code outside the event loop."""
+        return self._executor.submit(method, *args).result()
+
+    def load_channel(self, channel_id: int) -> list[QuoteMessage]:
+        """Return every stored message of a channel as (message_id, quote chain) pairs, oldest first."""
+        rows = self._conn.execute(
+            "SELECT message_id, quote, author, sender_id FROM quotes "
+            "WHERE channel_id = ? ORDER BY message_id, position",
+            (channel_id,)
+        )
+
+        messages: list[QuoteMessage] = []
+        for message_id, quote, author, sender_id in rows:
+            if not messages or messages[-1][0] != message_id:
+                messages.append((message_id, []))
+            messages[-1][1].append((quote, author, sender_id))
+
+        return messages
+
+    def last_message_id(self, channel_id: int) -> Optional[int]:
+        """Return the ID of the newest message already ingested, or None if the channel was never scanned."""
+        row = self._conn.execute(
+            "SELECT last_message_id FROM channels WHERE channel_id = ?",
+            (channel_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def save_messages(self, channel_id: int, messages: Iterable[QuoteMessage], last_message_id: Optional[int]):
+        """
+        Store parsed messages and advance the channel's high-water mark in one transaction.
+        Messages that were stored before are overwritten (e.g. after an edit).
+
+        Args:
+            channel_id: Source channel the messages belong to
+            messages: (message_id, quote) pairs
+            last_message_id: Newest message ID that was scanned, quotes or not
+        """
+        messages = list(messages)
+        with self._conn:
+            self._insert_messages(channel_id, messages)
+            if last_message_id is not None:
+                self._move_mark(channel_id, last_message_id)
+
+    def _insert_messages(self, channel_id: int, messages: list[QuoteMessage]):
+        rows = [
+            (channel_id, message_id, position, quote, author, sender_id)
+            for message_id, quote_chain in messages
+            for position, (quote, author, sender_id) in enumerate(quote_chain)
+        ]
+        self._conn.executemany(
+            "DELETE FROM quotes WHERE channel_id = ? AND message_id = ?",
+            [(channel_id, message_id) for message_id, _ in messages]
+        )
+        self._conn.executemany("INSERT INTO quotes VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def _move_mark(self, channel_id: int, last_message_id: int):
+        self._conn.execute(
+            "INSERT INTO channels VALUES (?, ?) "
+            "ON CONFLICT(channel_id) DO UPDATE SET last_message_id = MAX(last_message_id, excluded.last_message_id)",
+            (channel_id, last_message_id)
+        )
+
+    def delete_message(self, channel_id: int, message_id: int):
+        """Delete the stored quotes of a single message."""
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM quotes WHERE channel_id = ? AND message_id = ?",
+                (channel_id, message_id)
+            )
+
+    def clear_channel(self, channel_id: int):
+        """Delete all stored quotes and the high-water mark of a channel."""
+        with self._conn:
+            self._conn.execute("DELETE FROM quotes WHERE channel_id = ?", (channel_id,))
+            self._conn.execute("DELETE FROM channels WHERE channel_id = ?", (channel_id,))
+            self._conn.execute("DELETE FROM backfill_ranges WHERE channel_id = ?", (channel_id,))
+
+    # ---------- Backfill ranges ----------
+    def load_ranges(self, channel_id: int) -> list[tuple[int, int, Optional[int], bool]]:
+        """Return the (range_index, after_id, before_id, done) rows of an unfinished parallel backfill."""
+        return [
+            (range_index, after_id, before_id, bool(done))
+            for range_index, after_id, before_id, done in self._conn.execute(
+                "SELECT range_index, after_id, before_id, done FROM backfill_ranges "
+                "WHERE channel_id = ? ORDER BY range_index",
+                (channel_id,)
+            )
+        ]
+
+    def plan_ranges(self, channel_id: int, ranges: Iterable[tuple[int, Optional[int]]]):
+        """Start a parallel backfill over the given (after_id, before_id) ranges, oldest range first."""
+        with self._conn:
+            self._conn.execute("DELETE FROM backfill_ranges WHERE channel_id = ?", (channel_id,))
+            self._conn.executemany(
+                "INSERT INTO backfill_ranges VALUES (?, ?, ?, ?, 0)",
+                [(channel_id, range_index, after_id, before_id) for range_index, (after_id, before_id) in enumerate(ranges)]
+            )
+
+    def save_range(
+        self,
+        channel_id: int,
+        range_index: int,
+        messages: Iterable[QuoteMessage],
+        scanned_id: Optional[int],
+        done: bool = False
+    ):
+        """
+        Store the messages of one backfill range and move that range's start in one transaction,
+        so a failed range resumes after the last batch it saved.
+
+        Args:
+            channel_id: Source channel the messages belong to
+            range_index: Range the messages were fetched for
+            messages: (message_id, quote) pairs
+            scanned_id: Newest message ID scanned in this range, quotes or not
+            done: The range was scanned completely
+        """
+        with self._conn:
+            self._insert_messages(channel_id, list(messages))
+            self._conn.execute(
+                "UPDATE backfill_ranges SET after_id = MAX(after_id, COALESCE(?, 0)), done = MAX(done, ?) "
+                "WHERE channel_id = ? AND range_index = ?",
+                (scanned_id, int(done), channel_id, range_index)
+            )
+
+    def finish_ranges(self, channel_id: int):
+        """End a parallel backfill: the newest scanned message becomes the channel's high-water mark."""
+        with self._conn:
+            row = self._conn.execute(
+                "SELECT MAX(after_id) FROM backfill_ranges WHERE channel_id = ?",
+                (channel_id,)
+            ).fetchone()
+            if row[0] is not None:
+                self._move_mark(channel_id, row[0])
+            self._conn.execute("DELETE FROM backfill_ranges WHERE channel_id = ?", (channel_id,))
+
+    # ---------- Shuffle bags ----------
+    def load_bag(self, guild_id: str) -> Optional[tuple[int, Optional[int], list[int]]]:
+        """Return (channel_id, last_message_id, remaining message IDs) of a guild's bag, or None if it has none."""
+        row = self._conn.execute(
+            "SELECT channel_id, last_message_id FROM shuffle_bags WHERE guild_id = ?",
+            (guild_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        remaining = [message_id for (message_id,) in self._conn.execute(
+            "SELECT message_id FROM shuffle_bag_entries WHERE guild_id = ?",
+            (guild_id,)
+        )]
+        return row[0], row[1], remaining
+
+    def fill_bag(self, guild_id: str, channel_id: int, message_ids: Iterable[int], last_message_id: Optional[int]):
+        """Replace a guild's bag with a fresh set of message IDs."""
+        with self._conn:
+            self._conn.execute("DELETE FROM shuffle_bag_entries WHERE guild_id = ?", (guild_id,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO shuffle_bag_entries VALUES (?, ?)",
+                [(guild_id, message_id) for message_id in message_ids]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO shuffle_bags VALUES (?, ?, ?)",
+                (guild_id, channel_id, last_message_id)
+            )
+
+    def take_from_bag(self, guild_id: str, message_id: int):
+        """Remove one drawn message ID from a guild's bag."""
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM shuffle_bag_entries WHERE guild_id = ? AND message_id = ?",
+                (guild_id, message_id)
+            )
+
+    def add_to_bag(self, guild_id: str, message_ids: list[int]):
+        """Add newly ingested message IDs to a guild's bag and move its high-water mark."""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO shuffle_bag_entries VALUES (?, ?)",
+                [(guild_id, message_id) for message_id in message_ids]
+            )
+            self._conn.execute(
+                "UPDATE shuffle_bags SET last_message_id = MAX(COALESCE(last_message_id, 0), ?) WHERE guild_id = ?",
+                (max(message_ids), guild_id)
+            )
+
+    # ---------- Recent dailies ----------
+    def load_recents(self, guild_id: str, limit: int) -> list[int]:
+        """Return the last `limit` daily quote message IDs of a guild, newest first."""
+        return [message_id for (message_id,) in self._conn.execute(
+            "SELECT message_id FROM recent_dailies WHERE guild_id = ? ORDER BY seq DESC LIMIT ?",
+            (guild_id, limit)
+        )]
+
+    def add_recent(self, guild_id: str, message_id: int, capacity: int):
+        """Record a daily quote and drop everything older than the last `capacity` ones."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO recent_dailies "
+                "SELECT ?, COALESCE(MAX(seq), 0) + 1, ? FROM recent_dailies WHERE guild_id = ?",
+                (guild_id, message_id, guild_id)
+            )
+            self._conn.execute(
+                "DELETE FROM recent_dailies WHERE guild_id = ? "
+                "AND seq <= (SELECT MAX(seq) FROM recent_dailies WHERE guild_id = ?) - ?",
+                (guild_id, guild_id, capacity)
+            )
+
+    def close(self):
+        """Finish everything still queued and close the database."""
+        self._executor.shutdown(wait=True)
+        self._conn.close()
+
+
+def _log_failure(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"QuoteStore write failed: {future.exception()!r}")
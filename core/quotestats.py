@@ -1,5 +1,14 @@
-from my_types.quote_types import QuoteHistory
-import re
+import random
+import sys
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Optional
+
+from my_types.quote_types import Quote, QuoteHistory
+from core.alias_matcher import AliasMatcher
+
+_INT_SIZE = 32      # a message ID (or position) stored as a dict key or value
 
 
 class QuoteStats:
@@ -19,28 +28,297 @@ class QuoteStats:
         return sorted(result.items(), key=lambda item: item[1], reverse=True)
     
 
-    def count_total_quotes(self, known_users_dict: dict[str, list[str]]) -> list[tuple[str, int]]:
+    def count_total_quotes(self, matcher: AliasMatcher) -> list[tuple[str, int]]:
         result: dict[str, int] = {}
 
         for quote_chain in self.history:
             for quote_part in quote_chain:
                 author_data = quote_part[1]
 
-                matches = []
-                # Loop through {"Hintrill": ["hintrill", "elias a"], "Sabato": ["sabato", "safloet"]}
-                for primary_user, aliases in known_users_dict.items():
-                    for alias in aliases:
-                        # Find whole words only, case-insensitive
-                        match = re.search(r'\b' + re.escape(alias) + r'\b', author_data, re.IGNORECASE)
-                        if match:
-                            # Save the start index and the PRIMARY user name, not the alias
-                            matches.append((match.start(), primary_user))
-
-                if not matches:
+                # One search over all aliases, gives back the PRIMARY user that appeared FIRST
+                matched_primary_user = matcher.resolve(author_data)
+                if matched_primary_user is None:
                     continue
 
-                # Pick the primary user whose alias appeared FIRST in the author string
-                _, matched_primary_user = min(matches, key=lambda pair: pair[0])
                 result[matched_primary_user] = result.get(matched_primary_user, 0) + 1
 
-        return sorted(result.items(), key=lambda item: item[1], reverse=True)
\ No newline at end of file
+        return sorted(result.items(), key=lambda item: item[1], reverse=True)
+
+
+class MessagePool:
+    """
+    The messages one person is quoted in, drawn uniformly at random in O(1).
+
+    IDs sit in an array with their position in a dict, so removing swaps the last ID into the hole.
+    A message is in the pool once, no matter how many of its lines quote the person.
+    """
+
+    __slots__ = ("_ids", "_pos", "_refs")
+
+    def __init__(self):
+        self._ids = array("Q")
+        self._pos: dict[int, int] = {}      # message_id -> position in _ids
+        self._refs: dict[int, int] = {}     # message_id -> lines quoting the person
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, message_id: int):
+        refs = self._refs.get(message_id, 0)
+        if not refs:
+            self._pos[message_id] = len(self._ids)
+            self._ids.append(message_id)
+        self._refs[message_id] = refs + 1
+
+    def remove(self, message_id: int):
+        refs = self._refs.get(message_id)
+        if refs is None:
+            return
+        if refs > 1:
+            self._refs[message_id] = refs - 1
+            return
+
+        del self._refs[message_id]
+        pos = self._pos.pop(message_id)
+        last = self._ids.pop()
+        if last != message_id:
+            self._ids[pos] = last
+            self._pos[last] = pos
+
+    def pick(self) -> Optional[int]:
+        return random.choice(self._ids) if self._ids else None
+
+    def nbytes(self) -> int:
+        """Approximate amount of memory used by the pool."""
+        return (
+            sys.getsizeof(self._ids) + sys.getsizeof(self._pos) + sys.getsizeof(self._refs)
+            + len(self._pos) * 2 * _INT_SIZE
+        )
+
+
+class PersonTally:
+    """
+    Running "Times quoted" counts of one guild, built on top of a channel's author index.
+    Next to the counts it keeps a MessagePool per person, so /quote person: draws in O(1).
+
+    Authors repeat a lot, so every distinct author string is resolved to a primary user only once.
+    When the guild's aliases change, only the authors mentioning an added or removed alias
+    are resolved again; every other count and pool stays as it is.
+    """
+
+    def __init__(self, matcher: AliasMatcher, author_messages: dict[str, array]):
+        self.matcher = matcher
+        self.resolved: dict[str, Optional[str]] = {}
+        self.counts: Counter[str] = Counter()
+        self.messages: dict[str, MessagePool] = {}      # person -> messages quoting them
+
+        for author, message_ids in author_messages.items():
+            for message_id in message_ids:
+                self.add(author, message_id)
+
+    def add(self, author: str, message_id: int):
+        if author not in self.resolved:
+            self.resolved[author] = self.matcher.resolve(author)
+
+        person = self.resolved[author]
+        if person is not None:
+            self.counts[person] += 1
+            self.messages.setdefault(person, MessagePool()).add(message_id)
+
+    def remove(self, author: str, message_id: int):
+        person = self.resolved.get(author)
+        if person is None:
+            return
+
+        self.counts[person] -= 1
+        if self.counts[person] <= 0:
+            del self.counts[person]
+
+        pool = self.messages.get(person)
+        if pool is not None:
+            pool.remove(message_id)
+            if not pool:
+                del self.messages[person]
+
+    def nbytes(self) -> int:
+        """Approximate amount of memory used by the counts and pools (author strings belong to the QuoteTally)."""
+        return (
+            sys.getsizeof(self.resolved) + sys.getsizeof(self.counts) + sys.getsizeof(self.messages)
+            + sum(pool.nbytes() for pool in self.messages.values())
+        )
+
+    def sync(self, matcher: AliasMatcher, author_messages: dict[str, array]):
+        """Switch to a new matcher, re-resolving only the authors affected by the alias changes."""
+        if matcher is self.matcher:
+            return
+
+        old_pairs = {(primary, alias) for primary, aliases in self.matcher.key for alias in aliases}
+        new_pairs = {(primary, alias) for primary, aliases in matcher.key for alias in aliases}
+        changed_aliases = [alias for _, alias in old_pairs ^ new_pairs]
+        self.matcher = matcher
+
+        if not changed_aliases:
+            return
+
+        probe = AliasMatcher({"changed": changed_aliases})
+        for author, person in list(self.resolved.items()):
+            if probe.resolve(author) is None:
+                continue
+
+            new_person = matcher.resolve(author)
+            if new_person == person:
+                continue
+
+            message_ids = author_messages.get(author, ())
+            for message_id in message_ids:
+                self.remove(author, message_id)
+            self.resolved[author] = new_person
+            for message_id in message_ids:
+                self.add(author, message_id)
+
+
+class QuoteTally:
+    """
+    Running leaderboard aggregates of one source channel.
+
+    Updated every time quotes are cached, so /leaderboard only has to pick the top entries
+    instead of rescanning the whole history like QuoteStats does.
+    `author_messages` and `sender_messages` index the messages of every author string and sender
+    (sorted, once per quote line). The per-guild PersonTally uses them to move messages between people
+    when aliases change, and since Discord message IDs are snowflakes (their timestamp in the high bits),
+    the sorted IDs double as timestamp-sorted arrays: the count in a time window is two binary searches.
+    """
+
+    def __init__(self):
+        self.sender_counts: Counter[int] = Counter()
+        self.author_counts: Counter[str] = Counter()
+        self.author_messages: dict[str, array] = {}    # author -> message IDs
+        self.sender_messages: dict[int, array] = {}    # sender_id -> message IDs
+        self._people: dict[str, PersonTally] = {}      # guild_id -> PersonTally
+
+    def add(self, quote_chain: Quote, message_id: int):
+        for _, author, sender_id in quote_chain:
+            self.sender_counts[sender_id] += 1
+            self.author_counts[author] += 1
+
+            self._insert(self.author_messages, author, message_id)
+            self._insert(self.sender_messages, sender_id, message_id)
+
+            for person_tally in self._people.values():
+                person_tally.add(author, message_id)
+
+    def remove(self, quote_chain: Quote, message_id: int):
+        for _, author, sender_id in quote_chain:
+            self._decrement(self.sender_counts, sender_id)
+            self._decrement(self.author_counts, author)
+
+            self._delete(self.author_messages, author, message_id)
+            self._delete(self.sender_messages, sender_id, message_id)
+
+            for person_tally in self._people.values():
+                person_tally.remove(author, message_id)
+
+    def nbytes(self) -> int:
+        """Approximate amount of memory used by the aggregates, the message indexes and every PersonTally."""
+        return (
+            sys.getsizeof(self.sender_counts) + sys.getsizeof(self.author_counts)
+            + sys.getsizeof(self.author_messages) + sys.getsizeof(self.sender_messages)
+            + sum(sys.getsizeof(author) + sys.getsizeof(message_ids) for author, message_ids in self.author_messages.items())
+            + sum(_INT_SIZE + sys.getsizeof(message_ids) for message_ids in self.sender_messages.values())
+            + sum(person_tally.nbytes() for person_tally in self._people.values())
+        )
+
+    @staticmethod
+    def _decrement(counter: Counter, key):
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    @staticmethod
+    def _insert(index: dict, key, message_id: int):
+        message_ids = index.setdefault(key, array("Q"))
+        if not message_ids or message_ids[-1] <= message_id:
+            message_ids.append(message_id)      # new messages nearly always have the highest ID
+        else:
+            insort(message_ids, message_id)
+
+    @staticmethod
+    def _delete(index: dict, key, message_id: int):
+        message_ids = index.get(key)
+        if message_ids is None:
+            return
+
+        pos = bisect_left(message_ids, message_id)
+        if pos < len(message_ids) and message_ids[pos] == message_id:
+            del message_ids[pos]
+        if not message_ids:
+            del index[key]
+
+    @staticmethod
+    def _count_between(message_ids: array, start_id: Optional[int], end_id: Optional[int]) -> int:
+        """Amount of IDs in [start_id, end_id), None meaning unbounded."""
+        low = bisect_left(message_ids, start_id) if start_id is not None else 0
+        high = bisect_left(message_ids, end_id) if end_id is not None else len(message_ids)
+        return max(high - low, 0)
+
+    def people(self, guild_id: str, matcher: AliasMatcher) -> PersonTally:
+        """Get the PersonTally of a guild, brought up to date with its current aliases."""
+        person_tally = self._people.get(guild_id)
+        if person_tally is None:
+            person_tally = PersonTally(matcher, self.author_messages)
+            self._people[guild_id] = person_tally
+        else:
+            person_tally.sync(matcher, self.author_messages)
+        return person_tally
+
+    def top_senders(
+        self,
+        limit: Optional[int] = None,
+        start_id: Optional[int] = None,
+        end_id: Optional[int] = None
+    ) -> list[tuple[int, int]]:
+        """
+        Same result as QuoteStats.count_quotes_made(), cut off at `limit`.
+        With `start_id` / `end_id` (snowflakes, end exclusive) only quotes sent in that window count.
+        """
+        if start_id is None and end_id is None:
+            return self.sender_counts.most_common(limit)
+
+        counts: Counter[int] = Counter()
+        for sender_id, message_ids in self.sender_messages.items():
+            amount = self._count_between(message_ids, start_id, end_id)
+            if amount:
+                counts[sender_id] = amount
+        return counts.most_common(limit)
+
+    def top_quoted(
+        self,
+        guild_id: str,
+        matcher: AliasMatcher,
+        limit: Optional[int] = None,
+        start_id: Optional[int] = None,
+        end_id: Optional[int] = None
+    ) -> list[tuple[str, int]]:
+        """
+        Same result as QuoteStats.count_total_quotes(), cut off at `limit`.
+        With `start_id` / `end_id` (snowflakes, end exclusive) only quotes sent in that window count.
+        """
+        person_tally = self.people(guild_id, matcher)
+        if start_id is None and end_id is None:
+            return person_tally.counts.most_common(limit)
+
+        # every distinct author string is one binary search, no quote is looked at
+        counts: Counter[str] = Counter()
+        for author, person in person_tally.resolved.items():
+            message_ids = self.author_messages.get(author)
+            if person is None or message_ids is None:
+                continue
+            amount = self._count_between(message_ids, start_id, end_id)
+            if amount:
+                counts[person] += amount
+        return counts.most_common(limit)
+
+    def random_message_of(self, guild_id: str, matcher: AliasMatcher, person: str) -> Optional[int]:
+        """Draw a random message quoting a primary user, or None if they were never quoted."""
+        pool = self.people(guild_id, matcher).messages.get(person)
+        return pool.pick() if pool is not None else None
@@ -0,0 +1,62 @@
+# ========== Imports ==========
+from array import array
+from typing import Iterable, Iterator
+
+from my_types.quote_types import RECENTS_SIZE
+
+
+# ========== RecentDailies Class ==========
+class RecentDailies:
+    """
+    Fixed-capacity ring buffer of the message IDs a guild got as daily quote most recently.
+
+    Adding overwrites the oldest slot once the ring is full, and a companion dict of counts
+    gives O(1) `in` checks, so "was this posted in the last N days?" costs the same no matter N.
+    """
+
+    def __init__(self, capacity: int = RECENTS_SIZE, message_ids: Iterable[int] = ()):
+        """
+        Args:
+            capacity: Amount of recent quotes to remember
+            message_ids: Initial content, newest first (e.g. loaded from the QuoteStore)
+        """
+        self.capacity = max(capacity, 0)
+        self._ring = array("Q", [0] * self.capacity)
+        self._head = 0      # next slot to write
+        self._count = 0
+        self._members: dict[int, int] = {}      # message_id -> times it's in the ring
+
+        for message_id in reversed(list(message_ids)[:self.capacity]):
+            self.add(message_id)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._members
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate newest first."""
+        for offset in range(1, self._count + 1):
+            yield self._ring[(self._head - offset) % self.capacity]
+
+    def add(self, message_id: int):
+        if self.capacity == 0:
+            return
+
+        if self._count == self.capacity:
+            oldest = self._ring[self._head]
+            self._members[oldest] -= 1
+            if self._members[oldest] == 0:
+                del self._members[oldest]
+        else:
+            self._count += 1
+
+        self._ring[self._head] = message_id
+        self._head = (self._head + 1) % self.capacity
+        self._members[message_id] = self._members.get(message_id, 0) + 1
+
+    def resize(self, capacity: int):
+        """Change the capacity, keeping the newest entries."""
+        newest_first = list(self)
+        self.__init__(capacity, newest_first)
@@ -0,0 +1,311 @@
+# ========== Imports ==========
+import heapq
+import math
+import re
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Optional
+
+from core.quote_columns import QuoteColumns
+from my_types.quote_types import Quote
+
+
+# ========== Constants ==========
+TOKEN_REGEX = re.compile(r"\w+")
+BM25_K1 = 1.2               # how quickly repeating a term stops adding to the score
+ALL_TERMS_BONUS = 1.5       # score multiplier for quotes that match every term of the query
+MAX_PREFIX_EXPANSION = 50   # tokens a single unknown query term may expand to
+COMMON_TERM_RATIO = 0.1     # terms in more messages than this share are too common to walk in full
+COMMON_RERANK_FACTOR = 10   # candidates per result that common terms rerank
+COMMON_WINDOW_FACTOR = 5    # newest messages per candidate intersected for queries of only common terms
+
+_TOKEN_ENTRY_SIZE = 180     # rough cost of one token: its string, dict slot and two empty arrays
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase word tokens."""
+    return TOKEN_REGEX.findall(text.casefold())
+
+
+# ========== SearchIndex Class ==========
+class SearchIndex:
+    """
+    Inverted index over the quote texts and authors of one channel.
+
+    Every token maps to a posting list: the sorted Discord message IDs containing it (array('Q'))
+    with how often it appears in each (array('H')). Messages arrive mostly in order, so adding
+    is nearly always an append; edits and deletes remove the message from the lists of its own tokens.
+
+    Queries are ranked with BM25 (without length normalisation, quotes are all short),
+    and quotes matching every term get a bonus. A query term that isn't a known token
+    is expanded to the tokens it's a prefix of, so "pizz" still finds "pizza".
+    """
+
+    def __init__(self):
+        self._postings: dict[str, tuple[array, array]] = {}     # token -> (message_ids, term counts)
+        self._messages = 0
+        self._vocabulary: Optional[list[str]] = None            # sorted tokens, rebuilt when needed
+        self._token_bytes = 0
+
+    @classmethod
+    def build(cls, columns: QuoteColumns) -> "SearchIndex":
+        """
+        Index every message of `columns`, oldest first so every posting list is appended to.
+        Only reads `columns`, so it can run in an executor on a copy (see `QuoteColumns.copy()`).
+        """
+        index = cls()
+        message_ids = columns.message_ids
+        for msg in sorted(columns.live, key=message_ids.__getitem__):
+            index.add(message_ids[msg], columns.quote(msg))
+        return index
+
+    def __len__(self) -> int:
+        return self._messages
+
+    @staticmethod
+    def _term_counts(quote: Quote) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for text, author, _ in quote:
+            for token in tokenize(text) + tokenize(author):
+                counts[token] = counts.get(token, 0) + 1
+        return counts
+
+    # ---------- Writing ----------
+    def add(self, message_id: int, quote: Quote):
+        """Index a message. Remove its old version first when it's edited."""
+        for token, count in self._term_counts(quote).items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = (array("Q"), array("H"))
+                self._token_bytes += sys.getsizeof(token) + _TOKEN_ENTRY_SIZE
+                self._vocabulary = None
+
+            message_ids, counts = posting
+            if not message_ids or message_ids[-1] < message_id:
+                message_ids.append(message_id)
+                counts.append(min(count, 0xFFFF))
+            else:
+                pos = bisect_left(message_ids, message_id)
+                if pos < len(message_ids) and message_ids[pos] == message_id:
+                    counts[pos] = min(count, 0xFFFF)
+                    continue
+                message_ids.insert(pos, message_id)
+                counts.insert(pos, min(count, 0xFFFF))
+
+        self._messages += 1
+
+    def remove(self, message_id: int, quote: Quote):
+        """Remove a message that was indexed with `quote`."""
+        for token in self._term_counts(quote):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+
+            message_ids, counts = posting
+            pos = bisect_left(message_ids, message_id)
+            if pos < len(message_ids) and message_ids[pos] == message_id:
+                del message_ids[pos]
+                del counts[pos]
+
+            if not message_ids:
+                del self._postings[token]
+                self._token_bytes -= sys.getsizeof(token) + _TOKEN_ENTRY_SIZE
+                self._vocabulary = None
+
+        self._messages = max(self._messages - 1, 0)
+
+    def nbytes(self) -> int:
+        """Approximate amount of memory used by the index."""
+        return self._token_bytes + sum(
+            message_ids.itemsize * len(message_ids) + counts.itemsize * len(counts)
+            for message_ids, counts in self._postings.values()
+        )
+
+    # ---------- Searching ----------
+    def _expand(self, term: str) -> list[str]:
+        """Tokens matching a query term: the term itself, or the known tokens starting with it."""
+        if term in self._postings:
+            return [term]
+
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+
+        matches: list[str] = []
+        pos = bisect_left(self._vocabulary, term)
+        while pos < len(self._vocabulary) and self._vocabulary[pos].startswith(term) and len(matches) < MAX_PREFIX_EXPANSION:
+            matches.append(self._vocabulary[pos])
+            pos += 1
+        return matches
+
+    def _weight(self, message_ids: array) -> float:
+        """Highest score one token can add (its idf times the BM25 saturation limit)."""
+        idf = math.log(1 + (self._messages - len(message_ids) + 0.5) / (len(message_ids) + 0.5))
+        return idf * (BM25_K1 + 1)
+
+    @staticmethod
+    def _saturate(count: int) -> float:
+        return count / (count + BM25_K1)
+
+    def _top_single(self, token: str, limit: int) -> list[tuple[int, float]]:
+        """
+        Top results of a one-token query without scoring every posting.
+        The score only depends on the term count, so walk the counts from high to low, newest first.
+        """
+        message_ids, counts = self._postings[token]
+        weight = self._weight(message_ids)
+
+        results: list[tuple[int, float]] = []
+        for count in sorted(set(counts), reverse=True):
+            score = weight * self._saturate(count)
+            for pos in range(len(counts) - 1, -1, -1):
+                if counts[pos] == count:
+                    results.append((message_ids[pos], score))
+                    if len(results) == limit:
+                        return results
+        return results
+
+    def _size(self, tokens: list[str]) -> int:
+        return sum(len(self._postings[token][0]) for token in tokens)
+
+    def _newest(self, tokens: list[str], amount: int) -> list[int]:
+        """The newest `amount` messages containing any of the tokens, newest first."""
+        if len(tokens) == 1:
+            return self._postings[tokens[0]][0][-amount:][::-1].tolist()
+        return heapq.nlargest(amount, set().union(*(self._postings[token][0][-amount:] for token in tokens)))
+
+    def _common_candidates(self, groups: list[list[str]], limit: int) -> list[int]:
+        """
+        Candidates for a query made only of common terms: the newest messages containing as many
+        of them as possible. Only the newest COMMON_WINDOW_FACTOR * `limit` messages of every term
+        are intersected (rarest term first), a term that would leave nothing is skipped,
+        and the newest messages of the rarest term fill up what's left.
+        """
+        window = limit * COMMON_WINDOW_FACTOR
+        newest = self._newest(groups[0], window)
+        candidates = set(newest)
+        for tokens in groups[1:]:
+            narrowed = candidates.intersection(self._newest(tokens, window))
+            if narrowed:
+                candidates = narrowed
+
+        result = heapq.nlargest(limit, candidates)
+        for message_id in newest:
+            if len(result) >= limit:
+                break
+            if message_id not in candidates:
+                result.append(message_id)
+        return result
+
+    def search(self, query: str, limit: int = 100) -> list[tuple[int, float]]:
+        """
+        Find the messages best matching a query.
+
+        Terms are scored from rarest to most common. Once enough candidates were found,
+        common terms only rescore those candidates (a binary search per candidate) instead of
+        walking their whole posting list. That is only kept if no message outside the candidates
+        could still beat them (MaxScore), otherwise the common terms are scored in full.
+
+        Terms in more than COMMON_TERM_RATIO of the messages ("the", "a") are never walked in full:
+        they only rerank the best candidates of the other terms, topped up with the newest messages
+        containing all of them when there are too few. Their idf is close to zero, so this hardly changes
+        the ranking, but keeps queries full of common words in the milliseconds.
+
+        Returns:
+            list[tuple[int, float]]: (message_id, score) pairs, best first (newest first on ties)
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self._messages or limit <= 0:
+            return []
+
+        expanded = [self._expand(term) for term in terms]
+        if len(expanded) == 1 and len(expanded[0]) == 1:
+            return self._top_single(expanded[0][0], limit)
+
+        # rarest term first, by the total length of its posting lists
+        groups = sorted(expanded, key=self._size)
+        common_size = COMMON_TERM_RATIO * self._messages
+        common = [tokens for tokens in groups if self._size(tokens) > common_size]
+        groups = groups[:len(groups) - len(common)]
+
+        scores: dict[int, float] = {}
+        matched_terms: dict[int, int] = {}
+
+        def score_fully(tokens: list[str]):
+            seen: set[int] = set()
+            for token in tokens:
+                message_ids, counts = self._postings[token]
+                weight = self._weight(message_ids)
+                by_count = {count: weight * self._saturate(count) for count in set(counts)}
+                get = scores.get
+                for message_id, count in zip(message_ids, counts):
+                    scores[message_id] = get(message_id, 0.0) + by_count[count]
+                seen.update(message_ids)
+            get = matched_terms.get
+            for message_id in seen:
+                matched_terms[message_id] = get(message_id, 0) + 1
+
+        def rescore(tokens: list[str]):
+            seen: set[int] = set()
+            for token in tokens:
+                message_ids, counts = self._postings[token]
+                weight = self._weight(message_ids)
+                for message_id in scores:
+                    pos = bisect_left(message_ids, message_id)
+                    if pos < len(message_ids) and message_ids[pos] == message_id:
+                        scores[message_id] += weight * self._saturate(counts[pos])
+                        seen.add(message_id)
+            for message_id in seen:
+                matched_terms[message_id] += 1
+
+        def finish(required: int) -> dict[int, float]:
+            """Scores with the bonus for messages matching `required` terms."""
+            final = dict(scores)
+            if required > 1:
+                for message_id, matched in matched_terms.items():
+                    if matched == required:
+                        final[message_id] *= ALL_TERMS_BONUS
+            return final
+
+        def top(final: dict[int, float], amount: int) -> list[tuple[int, float]]:
+            return heapq.nlargest(amount, final.items(), key=lambda item: (item[1], item[0]))
+
+        done = 0
+        while done < len(groups):
+            size = self._size(groups[done])
+            # rescoring costs a binary search per candidate and token, walking costs the whole posting list
+            if done and len(scores) >= limit and size > len(scores) * len(groups[done]):
+                break
+            score_fully(groups[done])
+            done += 1
+
+        rest = groups[done:]
+        if rest:
+            # MaxScore: a message outside the candidates has none of the scored terms,
+            # so it can get at most the full weight of every remaining term (and no bonus)
+            snapshot = (dict(scores), dict(matched_terms))
+            for tokens in rest:
+                rescore(tokens)
+            best = top(finish(len(groups)), limit)
+            bound = sum(self._weight(self._postings[token][0]) for tokens in rest for token in tokens)
+            if len(best) < limit or best[-1][1] <= bound:
+                # not safe to skip, score the remaining terms in full
+                scores, matched_terms = snapshot
+                for tokens in rest:
+                    score_fully(tokens)
+
+        if common:
+            pool = limit * COMMON_RERANK_FACTOR
+            if len(scores) > pool:
+                keep = [message_id for message_id, _ in top(finish(len(groups)), pool)]
+                scores = {message_id: scores[message_id] for message_id in keep}
+                matched_terms = {message_id: matched_terms[message_id] for message_id in keep}
+            elif len(scores) < limit:
+                # too few messages with the other terms (or none were given), fill up with common ones
+                for message_id in self._common_candidates(common, pool):
+                    scores.setdefault(message_id, 0.0)
+                    matched_terms.setdefault(message_id, 0)
+            for tokens in common:
+                rescore(tokens)
+
+        return top(finish(len(terms)), limit)
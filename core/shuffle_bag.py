@@ -0,0 +1,120 @@
+# ========== Imports ==========
+import random
+from array import array
+from typing import Optional
+
+from core.quote_columns import QuoteColumns
+from core.quote_store import QuoteStore
+from core.recent_dailies import RecentDailies
+
+
+# ========== ShuffleBag Class ==========
+class ShuffleBag:
+    """
+    Non-repeating random selection of one guild's quotes.
+
+    The bag holds the message IDs that weren't drawn yet. Drawing swaps a random entry
+    with the last one and pops it, so every pick is O(1) and every quote is shown once per round.
+    When the bag runs empty it is refilled with all quotes, except the guild's recent daily quotes,
+    so the end of one round and the start of the next don't repeat each other.
+
+    Newly ingested quotes are spliced into the remaining bag. Deleted quotes are skipped when drawn.
+    If a QuoteStore is given, the remaining IDs are persisted (one row per ID), so a restart
+    continues the same round. The order doesn't need saving, drawing is random anyway.
+    The writes are queued on the store's thread (see `QuoteStore.submit()`), drawing never waits for the disk.
+    """
+
+    def __init__(
+        self,
+        guild_id: str,
+        channel_id: int,
+        recents: RecentDailies,
+        store: Optional[QuoteStore] = None
+    ):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.recents = recents
+        self.store = store
+        self._bag = array("Q")
+
+    @classmethod
+    def load(
+        cls,
+        guild_id: str,
+        columns: QuoteColumns,
+        channel_id: int,
+        recents: RecentDailies,
+        store: Optional[QuoteStore],
+        saved: Optional[tuple[int, Optional[int], list[int]]]
+    ) -> "ShuffleBag":
+        """
+        Restore a guild's bag, adding quotes that came in while it wasn't loaded.
+
+        Args:
+            saved: What `QuoteStore.load_bag()` returned for the guild, None if it has no bag
+        """
+        bag = cls(guild_id, channel_id, recents, store)
+        if saved is None or saved[0] != channel_id:
+            return bag      # empty, the first pick fills it
+
+        _, last_message_id, remaining = saved
+        bag._bag.extend(remaining)
+
+        if last_message_id is not None:
+            bag.splice([
+                columns.message_ids[msg]
+                for msg in columns.live
+                if columns.message_ids[msg] > last_message_id
+            ])
+
+        return bag
+
+    def __len__(self) -> int:
+        return len(self._bag)
+
+    def _refill(self, columns: QuoteColumns):
+        message_ids = [columns.message_ids[msg] for msg in columns.live]
+        self._bag = array("Q", (message_id for message_id in message_ids if message_id not in self.recents))
+
+        # everything was shown recently (tiny channel), allow repeats rather than nothing
+        if not self._bag:
+            self._bag = array("Q", message_ids)
+
+        if self.store is not None:
+            # a copy, the bag keeps changing while the store thread writes it
+            self.store.submit(
+                self.store.fill_bag, self.guild_id, self.channel_id, self._bag.tolist(), max(message_ids, default=None)
+            )
+
+    def pick(self, columns: QuoteColumns) -> Optional[int]:
+        """Draw a message ID that is still in `columns`. Returns None if the channel has no quotes."""
+        refilled = False
+        while True:
+            if not self._bag:
+                if refilled:
+                    return None
+                self._refill(columns)
+                refilled = True
+                continue
+
+            index = random.randrange(len(self._bag))
+            self._bag[index], self._bag[-1] = self._bag[-1], self._bag[index]
+            message_id = self._bag.pop()
+
+            if self.store is not None:
+                self.store.submit(self.store.take_from_bag, self.guild_id, message_id)
+
+            # deleted since it went into the bag
+            if message_id not in columns:
+                continue
+
+            return message_id
+
+    def splice(self, message_ids: list[int]):
+        """Put newly ingested quotes into the remaining bag, persisted in one write."""
+        if not message_ids:
+            return
+
+        self._bag.extend(message_ids)
+        if self.store is not None:
+            self.store.submit(self.store.add_to_bag, self.guild_id, message_ids)
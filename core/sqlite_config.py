@@ -0,0 +1,239 @@
+# ========== Imports ==========
+import os
+import json
+import sqlite3
+from typing import Optional
+
+from core.config_manager import ConfigManager, FILE as JSON_FILE
+from core.models import GuildConfig, DEFAULT_POST_TIME, DEFAULT_TIMEZONE
+
+
+# ========== Constants ==========
+DB_FILE = "data/config.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guilds (
+    guild_id       TEXT PRIMARY KEY,
+    source_channel INTEGER,
+    target_channel INTEGER,
+    admin          INTEGER,
+    post_time      TEXT,
+    timezone       TEXT
+);
+
+CREATE TABLE IF NOT EXISTS authorized_users (
+    guild_id TEXT    NOT NULL,
+    user_id  INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS known_users (
+    guild_id     TEXT NOT NULL,
+    primary_name TEXT NOT NULL,
+    alias        TEXT NOT NULL,
+    PRIMARY KEY (guild_id, primary_name, alias)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+# ========== SQLiteGuildConfig Model ==========
+class SQLiteGuildConfig(GuildConfig):
+    """
+    GuildConfig that writes every change straight to its own rows in SQLite.
+    Reads still come from the in-memory dict, so the property interface is the same as GuildConfig.
+    """
+
+    def __init__(self, guild_id: str, data: dict, conn: sqlite3.Connection):
+        super().__init__(guild_id, data)
+        self._conn = conn
+
+    def _update(self, column: str, value):
+        with self._conn:
+            self._conn.execute(f"UPDATE guilds SET {column} = ? WHERE guild_id = ?", (value, self.guild_id))
+
+    @GuildConfig.source_channel.setter
+    def source_channel(self, channel_id: Optional[int]):
+        GuildConfig.source_channel.fset(self, channel_id)
+        self._update("source_channel", channel_id)
+
+    @GuildConfig.target_channel.setter
+    def target_channel(self, channel_id: Optional[int]):
+        GuildConfig.target_channel.fset(self, channel_id)
+        self._update("target_channel", channel_id)
+
+    @GuildConfig.post_time.setter
+    def post_time(self, value: str):
+        GuildConfig.post_time.fset(self, value)
+        self._update("post_time", value)
+
+    @GuildConfig.timezone.setter
+    def timezone(self, value: str):
+        GuildConfig.timezone.fset(self, value)
+        self._update("timezone", value)
+
+    def _insert_aliases(self, primary_name: str):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO known_users VALUES (?, ?, ?)",
+                [(self.guild_id, primary_name, alias) for alias in self.known_users.get(primary_name, [])]
+            )
+
+    def add_known_user(self, primary_name: str):
+        super().add_known_user(primary_name)
+        self._insert_aliases(primary_name)
+
+    def add_known_alias(self, primary_name: str, alias: str):
+        super().add_known_alias(primary_name, alias)
+        self._insert_aliases(primary_name)
+
+    def add_authorized_user(self, user_id: int):
+        super().add_authorized_user(user_id)
+        with self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO authorized_users VALUES (?, ?)", (self.guild_id, user_id))
+
+    def remove_authorized_user(self, user_id):
+        super().remove_authorized_user(user_id)
+        with self._conn:
+            self._conn.execute("DELETE FROM authorized_users WHERE guild_id = ? AND user_id = ?", (self.guild_id, user_id))
+
+
+# ========== Class SQLiteConfigManager ==========
+class SQLiteConfigManager(ConfigManager):
+    """
+    ConfigManager backend that keeps guilds, authorized users and known users/aliases in SQLite tables.
+
+    Same API as ConfigManager (`get_guild()`, `iter_guilds()`, `add_guild()`, `remove_guild()`),
+    but every change updates only the rows of that one guild the moment it happens.
+    `save()` is still there so callers don't have to care which backend they got, it just does nothing.
+
+    On first start, an existing config.json is imported once.
+    """
+
+    def __init__(self, path: str = DB_FILE, json_path: str = JSON_FILE):
+        self.path = path
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(SCHEMA)
+        self._migrate_json(json_path)
+        self.data = self._load()
+
+    # ---------- Loading ----------
+    def _migrate_json(self, json_path: str):
+        """One-time import of config.json into the tables."""
+        done = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+        if done is not None:
+            return
+
+        guilds = {}
+        if os.path.exists(json_path):
+            with open(json_path, "r", encoding="utf-8") as f:
+                guilds = json.load(f).get("guilds", {})
+
+        with self._conn:
+            for guild_id, guild_data in guilds.items():
+                self._insert_guild(guild_id, guild_data)
+            self._conn.execute("INSERT INTO meta VALUES ('migrated_json', ?)", (json_path,))
+
+    def _insert_guild(self, guild_id: str, guild_data: dict):
+        self._conn.execute(
+            "INSERT OR IGNORE INTO guilds VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                guild_id,
+                guild_data.get("source_channel"),
+                guild_data.get("target_channel"),
+                guild_data.get("admin"),
+                guild_data.get("post_time", DEFAULT_POST_TIME),
+                guild_data.get("timezone", DEFAULT_TIMEZONE),
+            )
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO authorized_users VALUES (?, ?)",
+            [(guild_id, user_id) for user_id in guild_data.get("authorized_users", [])]
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO known_users VALUES (?, ?, ?)",
+            [
+                (guild_id, primary_name, alias)
+                for primary_name, aliases in guild_data.get("known_users", {}).items()
+                for alias in aliases
+            ]
+        )
+
+    def _load(self) -> dict:
+        """Load every guild into the same dict layout config.json uses."""
+        guilds: dict[str, dict] = {}
+
+        for guild_id, source, target, admin, post_time, timezone in self._conn.execute("SELECT * FROM guilds"):
+            guilds[guild_id] = {
+                "source_channel": source,
+                "target_channel": target,
+                "authorized_users": [],
+                "admin": admin,
+                "known_users": {},
+                "post_time": post_time,
+                "timezone": timezone,
+            }
+
+        for guild_id, user_id in self._conn.execute("SELECT guild_id, user_id FROM authorized_users ORDER BY rowid"):
+            if guild_id in guilds:
+                guilds[guild_id]["authorized_users"].append(user_id)
+
+        # rowid order keeps primaries and aliases in the order they were added (matters for alias matching)
+        for guild_id, primary_name, alias in self._conn.execute("SELECT guild_id, primary_name, alias FROM known_users ORDER BY rowid"):
+            if guild_id in guilds:
+                guilds[guild_id]["known_users"].setdefault(primary_name, []).append(alias)
+
+        return {"guilds": guilds}
+
+    # ---------- Saving ----------
+    def save(self):
+        """Nothing to do, every change is already written to its rows."""
+
+    async def flush(self):
+        """Nothing to do, every change is already written to its rows."""
+
+    def save_now(self):
+        """Nothing to do, every change is already written to its rows."""
+
+    # ---------- Guilds ----------
+    def get_guild(self, guild_id: int) -> SQLiteGuildConfig:
+        """Returns SQLiteGuildConfig, creates default if missing (using add_guild method)."""
+        str_guild_id = str(guild_id)
+        if str_guild_id not in self.data["guilds"]:
+            self.add_guild(guild_id)
+
+        return SQLiteGuildConfig(str_guild_id, self.data["guilds"][str_guild_id], self._conn)
+
+    def iter_guilds(self):
+        """Iterate over existing SQLiteGuildConfig objects without modifying config."""
+        for guild_id_str, guild_data in self.data["guilds"].items():
+            yield SQLiteGuildConfig(guild_id_str, guild_data, self._conn)
+
+    def add_guild(self, guild_id: int):
+        """Adds a Discord Guild using default values. Needs its ID."""
+        str_guild_id = str(guild_id)
+        if str_guild_id in self.data["guilds"]:
+            return
+
+        super().add_guild(guild_id)
+        with self._conn:
+            self._insert_guild(str_guild_id, self.data["guilds"][str_guild_id])
+
+    def remove_guild(self, guild_id: int) -> bool:
+        """Removes a Discord Guild and all of its rows. Needs its ID.
+        Returns:
+            bool: True if success, False if Guild doesn't exist.
+        """
+        str_guild_id = str(guild_id)
+        with self._conn:
+            for table in ("guilds", "authorized_users", "known_users"):
+                self._conn.execute(f"DELETE FROM {table} WHERE guild_id = ?", (str_guild_id,))
+
+        return super().remove_guild(guild_id)
+
+    def close(self):
+        self._conn.close()
@@ -3,13 +3,22 @@ import os
 import dotenv
 import discord
 import datetime
+import time
 
 from discord import app_commands
+from discord.ext import tasks
 from commands.quote_commands import register_commands
 from commands.error_handler import register_errors
+from commands.tree_sync import sync_if_changed
 from core.config_manager import ConfigManager
+from core.sqlite_config import SQLiteConfigManager
 from core.cache import QuoteCache
+from core.quote_store import QuoteStore
 from tasks.daily_quote import DailyQuoteScheduler
+from my_types.quote_types import CACHE_MAX_BYTES, CACHE_MAX_AGE, RECENTS_SIZE
+from quotes.fetcher import ingest_message, forget_message
+from core.helpers import channel_resolver
+from core.metrics import metrics, METRICS_FILE, DUMP_INTERVAL
 
 
 # ========== Environment Setup ==========
@@ -17,8 +26,14 @@ dotenv.load_dotenv()
 
 
 # ========== Initialize Managers ==========
-config_manager = ConfigManager()
-cache = QuoteCache()
+if os.getenv("CONFIG_BACKEND", "json").lower() == "sqlite":
+    config_manager = SQLiteConfigManager()
+else:
+    config_manager = ConfigManager(write_behind=True)
+cache_max_mb = int(os.getenv("CACHE_MAX_MB", CACHE_MAX_BYTES // (1024 * 1024)))
+cache_max_age_minutes = float(os.getenv("CACHE_MAX_AGE_MINUTES", CACHE_MAX_AGE / 60))
+cache = QuoteCache(QuoteStore(), max_bytes=cache_max_mb * 1024 * 1024, max_age=cache_max_age_minutes * 60)
+cache.edit_recents_size(int(os.getenv("RECENTS_SIZE", RECENTS_SIZE)))     # daily quotes that won't repeat
 
 
 # ========== Setup ==========
@@ -31,7 +46,34 @@ tree = app_commands.CommandTree(client)
 # AppCommand objects, each of which knows command name, desc, parameter info, function to call
 # So it looks like this: "id" + AppCommand(callback=function, metadata=...)
 
-scheduler = DailyQuoteScheduler(client, config_manager, cache)
+scheduler = DailyQuoteScheduler(
+    client, config_manager, cache,
+    workers=int(os.getenv("DAILY_WORKERS", 10)),
+    prewarm_minutes=int(os.getenv("DAILY_PREWARM_MINUTES", 5)),
+)
+
+
+# ========== Metrics ==========
+def collect_cache_metrics(registry):
+    """Cache size per guild (of the guild's source channel) and in total."""
+    registry.reset("cache_bytes")
+    for guild_data in config_manager.iter_guilds():
+        if guild_data.source_channel is not None:
+            registry.set_gauge("cache_bytes", cache.channel_memory_usage(guild_data.source_channel), guild=guild_data.guild_id)
+    registry.set_gauge("cache_bytes_total", cache.memory_usage())
+    registry.set_gauge("cache_channels", cache.cached_channels())
+
+metrics.add_collector(collect_cache_metrics)
+
+@tasks.loop(seconds=DUMP_INTERVAL)
+async def dump_metrics():
+    metrics.write_prometheus(os.getenv("METRICS_FILE", METRICS_FILE))
+
+@client.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    # measured from when the user ran it, so it's what they experienced
+    latency = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    metrics.observe("command_seconds", latency, command=command.qualified_name)
 
 
 # ========== Startup ==========
@@ -39,40 +81,107 @@ token = os.getenv("DISCORD_TOKEN")
 if token is None:
     raise RuntimeError("DISCORD_TOKEN environment variable not set")
 
+commands_registered = False
+
 @client.event
 async def on_ready():
+    # on_ready runs again after every gateway reconnect, so everything in here has to be idempotent
+    global commands_registered
     print(f"Logged in as {client.user}")
+    timings: dict[str, float] = {}
 
-    register_commands(tree, config_manager, cache)
-    register_errors(tree)
+    # register commands only once per process
+    start = time.perf_counter()
+    if not commands_registered:
+        register_commands(tree, config_manager, cache, scheduler)
+        register_errors(tree)
+        commands_registered = True
+    timings["register"] = time.perf_counter() - start
 
-    scheduler.start()
-    
-    # sync with test server
+    # sync with test server, only if the command schema changed
     guild_id = os.getenv("GUILD_ID")
     if guild_id is None:
         raise RuntimeError("GUILD_ID environment variable not set")
     
+    start = time.perf_counter()
     guild = discord.Object(int(guild_id))
     tree.copy_global_to(guild=guild)
-    await tree.sync(guild=guild) 
-
-    # sync all joined guilds
-    async for guild in client.fetch_guilds():
-        print(guild.name)
+    synced = await sync_if_changed(tree, guild)
+    timings["tree_sync" if synced else "tree_sync (skipped)"] = time.perf_counter() - start
+
+    # sync joined guilds from the gateway cache, only adding the ones we don't know yet
+    start = time.perf_counter()
+    known_guilds = {guild_data.guild_id for guild_data in config_manager.iter_guilds()}
+    new_guilds = [guild for guild in client.guilds if str(guild.id) not in known_guilds]
+    for guild in new_guilds:
+        print(f"New guild: {guild.name}")
         config_manager.add_guild(guild.id)
-    config_manager.save()
+        # on a reconnect the scheduler is already running and start() won't pick these up
+        scheduler.schedule(config_manager.get_guild(guild.id))
+    if new_guilds:
+        config_manager.save()
+    timings["guilds"] = time.perf_counter() - start
+
+    # schedules every known guild on the first ready, does nothing on a reconnect
+    start = time.perf_counter()
+    scheduler.start()
+    timings["scheduler"] = time.perf_counter() - start
+
+    if not dump_metrics.is_running():
+        dump_metrics.start()
+
+    for phase, seconds in timings.items():
+        metrics.set_gauge("startup_seconds", seconds, phase=phase)
+
+    print("Startup: " + ", ".join(f"{phase} {seconds * 1000:.1f}ms" for phase, seconds in timings.items()))
 
 
 @client.event
 async def on_guild_join(guild: discord.Guild):
     config_manager.add_guild(guild.id)
     config_manager.save()
+    scheduler.schedule(config_manager.get_guild(guild.id))
 
 @client.event
 async def on_guild_remove(guild: discord.Guild):
     config_manager.remove_guild(guild.id)
     config_manager.save()
+    scheduler.unschedule(guild.id)
+
+@client.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    channel_resolver.invalidate(channel.id)
+
+@client.event
+async def on_thread_delete(thread: discord.Thread):
+    channel_resolver.invalidate(thread.id)
+
+
+# ========== Live Quote Ingestion ==========
+# Only channels that are already cached get updated, which is exactly the set of scanned source channels.
+# The raw events are used for edits/deletes so messages outside discord.py's message cache count too.
+@client.event
+async def on_message(message: discord.Message):
+    ingest_message(cache, message.channel.id, message.id, message.content, message.author.id)
+
+@client.event
+async def on_raw_message_edit(payload: discord.RawMessageUpdateEvent):
+    message = payload.message
+    ingest_message(cache, payload.channel_id, payload.message_id, message.content, message.author.id)
+
+@client.event
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    forget_message(cache, payload.channel_id, payload.message_id)
+
+@client.event
+async def on_raw_bulk_message_delete(payload: discord.RawBulkMessageDeleteEvent):
+    for message_id in payload.message_ids:
+        forget_message(cache, payload.channel_id, message_id)
+
 
 if __name__ == "__main__":
-    client.run(token)
\ No newline at end of file
+    client.run(token)
+    # write whatever the write-behind config still has pending
+    config_manager.save_now()
+    # and whatever live ingestion still has queued for the quote store
+    cache.store.close()
\ No newline at end of file
@@ -4,5 +4,9 @@ QuoteLine = Tuple[str, str, int]     # ("quote", "name")
 Quote = List[QuoteLine]         # full chain (one quote tuple)
 T_Quote = Tuple[QuoteLine, ...] # full chain but tuples for set operations
 QuoteHistory = List[Quote]      # all prepared quotes in a list
+QuoteMessage = Tuple[int, Quote]    # (message_id, quote chain)
 
-RECENTS_SIZE = 50
\ No newline at end of file
+RECENTS_SIZE = 50
+CACHE_MAX_BYTES = 256 * 1024 * 1024     # global memory budget of QuoteCache
+CACHE_MAX_AGE = 6 * 60 * 60             # seconds before a cached channel is refreshed in the background
+REFRESH_RETRY_DELAY = 60                # seconds before a failed background refresh is retried, doubles every failure
@@ -5,6 +5,20 @@ from my_types.quote_types import Quote
 from core.models import GuildConfig
 
 
+# ========== Constants ==========
+LEADERBOARD_SIZE = 10
+LEADERBOARD_PAGES = 2
+LEADERBOARD_WINDOWS = {
+    "all": "All time",
+    "week": "This week",
+    "month": "This month",
+    "year": "This year",
+}
+SEARCH_PAGE_SIZE = 5
+SEARCH_MAX_RESULTS = 100
+SEARCH_MAX_QUERY = 100      # characters, keeps the embed title under Discord's 256
+
+
 # ========== Embed Creation Functions ==========
 def create_quote_embed(quote_data: Quote) -> discord.Embed:
     """
@@ -89,7 +103,8 @@ async def create_info_embed(
 def create_leaderboard_embed(
         sender_data,
         quoted_data: list[tuple[str, int]],
-        page: int
+        page: int,
+        period: str = LEADERBOARD_WINDOWS["all"]
     ) -> discord.Embed:
 
     match(page):
@@ -106,10 +121,11 @@ def create_leaderboard_embed(
         title=f"🏆 Leaderboard\n{f"{page + 1} | {title}"}",
         color=discord.Color.gold()
     )
+    embed.set_footer(text=period)
     
     match(page):
         case 0:
-            slice_data = sender_data[:10]
+            slice_data = sender_data[:LEADERBOARD_SIZE]
             if not slice_data:
                 embed.description = "No data."
                 return embed
@@ -118,7 +134,7 @@ def create_leaderboard_embed(
             embed.description = "\n\n".join(lines)
         
         case 1:
-            slice_data = quoted_data[:10]
+            slice_data = quoted_data[:LEADERBOARD_SIZE]
             if not slice_data:
                 embed.description = "No data."
                 return embed
@@ -129,4 +145,41 @@ def create_leaderboard_embed(
 
             
     
-    return embed
\ No newline at end of file
+    return embed
+
+
+def create_search_embed(
+        query: str,
+        results: list[tuple[int, Quote]],
+        page: int,
+        source_channel: discord.TextChannel | discord.Thread
+    ) -> discord.Embed:
+    """
+    Create one page of search results.
+
+    Args:
+        query (str): What was searched for
+        results (list[tuple[int, Quote]]): (message_id, quote) pairs, best match first
+        page (int): Page to show, starting at 0
+        source_channel: Channel the quotes come from, used to link to the messages
+    """
+    page_count = max((len(results) + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE, 1)
+    embed = discord.Embed(
+        title=f"🔎 Search: {query}",
+        color=discord.Colour.from_rgb(130, 182, 217)
+    )
+
+    slice_data = results[page * SEARCH_PAGE_SIZE:(page + 1) * SEARCH_PAGE_SIZE]
+    if not slice_data:
+        embed.description = "No quotes found."
+        return embed
+
+    lines: list[str] = []
+    for i, (message_id, quote) in enumerate(slice_data, start=page * SEARCH_PAGE_SIZE):
+        quote_lines = "\n".join(f"“{q}” — *{a}*" for q, a, _ in quote)
+        link = f"https://discord.com/channels/{source_channel.guild.id}/{source_channel.id}/{message_id}"
+        lines.append(f"**#{i + 1}** {quote_lines}\n[Jump to message]({link})")
+
+    embed.description = "\n\n".join(lines)[:4096]
+    embed.set_footer(text=f"Page {page + 1}/{page_count} | {len(results)} result{'s' if len(results) != 1 else ''}")
+    return embed
@@ -1,113 +1,481 @@
 # ========== Imports ==========
-import random
-import re
 import discord
 import asyncio
-from typing import Optional, Tuple
+import heapq
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Iterable, Optional
 
-from core.cache import QuoteCache
-from my_types.quote_types import Quote, QuoteHistory
-from core.models import GuildConfig
+from core.alias_matcher import AliasMatcher
+from core.cache import ChannelQuotes, QuoteCache
+from core.metrics import metrics
+from core.quote_columns import QuoteView
+from quotes.tokenizer import extract_quotes
+from my_types.quote_types import Quote, QuoteMessage
+
+
+# ========== Constants ==========
+BATCH_SIZE = 500        # messages parsed per executor call
+QUEUE_BATCHES = 4       # batches the pager may run ahead of the parser before it has to wait
+
+# Parsing and building channel caches run here instead of on the event loop. Parsing can be swapped
+# to a ProcessPoolExecutor (parse_batch is a plain module-level function, so it pickles fine).
+parse_executor: Executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quote-parser")
+
+RANGE_COUNT = 16        # snowflake ranges a first-time backfill is split into
+RANGE_CONCURRENCY = 4   # ranges fetched at the same time (discord.py still queues on the channel's rate limit bucket)
+
+RawMessage = tuple[int, str, int]   # (message_id, content, sender_id)
+BatchHandler = Callable[[list[QuoteMessage], int], Awaitable[None]]
+
+
+# ========== Parsing Functions ==========
+def parse_quotes(content: str, sender_id: int) -> Quote:
+    """
+    Extract every quote of a single message (see `quotes.tokenizer` for the formats).
+
+    Returns:
+        Quote: A list of (quote, author, sender_id) tuples, empty if the message has no quotes.
+    """
+    # Convert 2-tuples to 3-tuples by adding the sender's id
+    return [(quote, author, sender_id) for quote, author in extract_quotes(content)]
+
+
+def parse_batch(batch: list[RawMessage]) -> list[QuoteMessage]:
+    """Parse a batch of raw messages, keeping only the ones that contain quotes."""
+    parsed: list[QuoteMessage] = []
+    for message_id, content, sender_id in batch:
+        quotes_with_sender = parse_quotes(content, sender_id)
+        if quotes_with_sender:
+            parsed.append((message_id, quotes_with_sender))
+    return parsed
+
+
+async def build_channel(channel_id: int, messages: Iterable[QuoteMessage]) -> ChannelQuotes:
+    """
+    Build the cache of a whole channel (columns and tally) in the parse executor.
+    For 100k quotes that takes seconds, the event loop keeps running meanwhile and only swaps the result in.
+    """
+    return await asyncio.get_running_loop().run_in_executor(parse_executor, ChannelQuotes.build, channel_id, messages)
+
+
+# ========== Backfill Pipeline ==========
+async def _page_messages(
+        channel: discord.TextChannel | discord.Thread,
+        after: Optional[discord.abc.Snowflake],
+        before: Optional[discord.abc.Snowflake],
+        queue: asyncio.Queue
+    ):
+    """Stage 1: page through the channel and hand batches of raw messages to the parser."""
+    batch: list[RawMessage] = []
+    try:
+        async for msg in channel.history(limit=None, after=after, before=before, oldest_first=True):
+            batch.append((msg.id, msg.content, msg.author.id))
+            if len(batch) >= BATCH_SIZE:
+                await queue.put(batch)      # blocks while the parser is behind (backpressure)
+                batch = []
+
+        if batch:
+            await queue.put(batch)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        # let the parser finish what it got, _run_pipeline raises this error afterwards
+        await queue.put(None)
+        raise
+
+    await queue.put(None)
+
+
+async def _parse_messages(queue: asyncio.Queue, on_batch: BatchHandler) -> list[QuoteMessage]:
+    """Stage 2: parse every batch off the event loop and await `on_batch` with it and the newest scanned ID."""
+    loop = asyncio.get_running_loop()
+    new_messages: list[QuoteMessage] = []
+
+    while (batch := await queue.get()) is not None:
+        parsed = await loop.run_in_executor(parse_executor, parse_batch, batch)
+        new_messages.extend(parsed)
+        await on_batch(parsed, batch[-1][0])
+
+    return new_messages
+
+
+async def _run_pipeline(
+        channel: discord.TextChannel | discord.Thread,
+        after: Optional[discord.abc.Snowflake],
+        before: Optional[discord.abc.Snowflake],
+        on_batch: BatchHandler
+    ) -> list[QuoteMessage]:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_BATCHES)
+    pager = asyncio.create_task(_page_messages(channel, after, before, queue))
+
+    try:
+        new_messages = await _parse_messages(queue, on_batch)
+    finally:
+        # the parser failed, don't leave the pager waiting on a full queue
+        if not pager.done():
+            pager.cancel()
+
+    # raises the error of the pager, if it had one
+    await pager
+    return new_messages
+
+
+async def backfill_channel(
+        channel: discord.TextChannel | discord.Thread,
+        cache: QuoteCache,
+        after: Optional[discord.abc.Snowflake] = None
+    ) -> list[QuoteMessage]:
+    """
+    Fetch and parse every message after `after` as a two stage pipeline.
+
+    The pager and the parser are connected by a bounded queue, so a 100k message channel never sits
+    in memory as raw messages, and parsing never blocks heartbeats or interactions.
+    Every parsed batch is stored right away (on the store's thread), so an interrupted backfill
+    resumes where it stopped.
+    """
+    async def save(parsed: list[QuoteMessage], scanned_id: int):
+        if cache.store is not None:
+            await cache.store.run(cache.store.save_messages, channel.id, parsed, scanned_id)
+
+    return await _run_pipeline(channel, after, None, save)
+
+
+def split_snowflakes(after_id: int, before_id: int, parts: int) -> list[tuple[int, Optional[int]]]:
+    """
+    Split the IDs between `after_id` and `before_id` into `parts` (after_id, before_id) ranges.
+    The last range is left open (before_id None), so messages sent during the backfill aren't missed.
+    """
+    step = max((before_id - after_id) // max(parts, 1), 1)
+    starts = [start for start in range(after_id, before_id, step)][:parts] or [after_id]
+    return [
+        (start, starts[index + 1] + 1 if index + 1 < len(starts) else None)
+        for index, start in enumerate(starts)
+    ]
+
+
+async def backfill_channel_parallel(
+        channel: discord.TextChannel | discord.Thread,
+        cache: QuoteCache,
+        concurrency: int = RANGE_CONCURRENCY
+    ) -> list[QuoteMessage]:
+    """
+    Fetch the whole channel by splitting its lifetime into snowflake ranges and scanning them concurrently.
+
+    Every range runs its own pipeline (see `backfill_channel()`) and stores its progress per batch.
+    If a range fails, the other ranges still finish and the error is raised afterwards;
+    the next call only scans what is left of the unfinished ranges.
+    The high-water mark is only set once every range is done.
+
+    Returns:
+        list[QuoteMessage]: The messages found in this call, oldest first.
+    """
+    store = cache.store
+    ranges = await store.run(store.load_ranges, channel.id) if store is not None else []
+    if not ranges:
+        # nothing in a channel is older than the channel itself
+        newest = discord.utils.time_snowflake(discord.utils.utcnow(), high=True)
+        planned = split_snowflakes(channel.id, newest, RANGE_COUNT)
+        if store is not None:
+            await store.run(store.plan_ranges, channel.id, planned)
+        ranges = [(range_index, after_id, before_id, False) for range_index, (after_id, before_id) in enumerate(planned)]
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def scan_range(range_index: int, after_id: int, before_id: Optional[int]) -> list[QuoteMessage]:
+        async def save(parsed: list[QuoteMessage], scanned_id: int):
+            if store is not None:
+                await store.run(store.save_range, channel.id, range_index, parsed, scanned_id)
+
+        async with semaphore:
+            before = discord.Object(id=before_id) if before_id is not None else None
+            messages = await _run_pipeline(channel, discord.Object(id=after_id), before, save)
+
+        if store is not None:
+            await store.run(store.save_range, channel.id, range_index, [], None, True)
+        return messages
+
+    results = await asyncio.gather(
+        *(scan_range(range_index, after_id, before_id) for range_index, after_id, before_id, done in ranges if not done),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    if store is not None:
+        await store.run(store.finish_ranges, channel.id)
+
+    # every range is sorted already
+    return list(heapq.merge(*results, key=lambda message: message[0]))
 
 
 # ========== Quote Fetching Functions ==========
 async def fetch_message_history_quotes(
         channel: discord.TextChannel | discord.Thread,
         cache: QuoteCache
-    ) -> QuoteHistory:
+    ) -> QuoteView:
     """
-    Fetch all messages in a channel and extract quotes using a regex.
+    Fetch all messages in a channel and extract their quotes.
 
     Each message may contain multiple quotes with the format:
         "quote text"
         - author
 
+    If the cache has a QuoteStore, previously parsed quotes are loaded from disk and
+    only messages newer than the stored high-water mark are requested from Discord.
+    New messages go through `backfill_channel()` (or `backfill_channel_parallel()` the first time),
+    so parsing happens off the event loop.
+
+    Concurrent calls for the same cold channel share one fetch (single-flight): the first call
+    starts it, later calls wait for the same task instead of scanning the channel again.
+    The same goes for a cold channel an admin refresh is rebuilding.
+    A cached channel older than the cache's max age is returned right away and refreshed in the background.
+
     Args:
         channel (discord.TextChannel | discord.Thread): A text channel or thread to scan.
         cache (QuoteCache): A QuoteCache instance
 
     Returns:
-        list (list[Quote]): A list of messages, where each message is a list of (quote, author) tuples.
-        Returns an empty list if no quotes are found.
+        QuoteView: A list-like view of messages, where each message is a list of (quote, author) tuples.
+        Empty if no quotes are found.
     """
-    
+
     # check cache
-    cached_quotes = cache.get_quote_history()
-    if len(cached_quotes) != 0:
-        return cached_quotes
+    if cache.has_channel(channel.id):
+        metrics.inc("cache_requests_total", result="hit")
+        if cache.is_stale(channel.id):
+            start_refresh(channel, cache)       # stale-while-revalidate
+        return cache.get_quote_history(channel.id)
 
-    # fetch everything using discord's API
-    # Support both straight quotes (") and curly quotes (“ ”)
-    QUOTE_REGEX = re.compile(r'(?:"|“|”)([^"“”]+)(?:"|“|”)[\n]+[-~]\s*(.+)')
-    all_matches: QuoteHistory = []
+    # an admin refresh is rebuilding the channel already, scanning it a second time would race its ranges
+    refreshing = cache.refreshing.get(channel.id)
+    if refreshing is not None:
+        metrics.inc("cache_requests_total", result="coalesced")
+        return await asyncio.shield(refreshing)
 
-    async for msg in channel.history(limit=None):
-        matches = QUOTE_REGEX.findall(msg.content)
-        if matches:
-            # Convert 2-tuples to 3-tuples by adding msg.author.id
-            quotes_with_sender = [(quote, author, msg.author.id) for quote, author in matches]
-            all_matches.append(quotes_with_sender)
+    task = cache.loading.get(channel.id)
+    if task is None:
+        metrics.inc("cache_requests_total", result="miss")
+        task = asyncio.create_task(_load_channel(channel, cache))
+        cache.loading[channel.id] = task
 
-    # save history to cache
-    cache.cache_quote_history(all_matches)
-    return all_matches
+        def done(finished: asyncio.Task):
+            if cache.loading.get(channel.id) is finished:
+                del cache.loading[channel.id]
+        task.add_done_callback(done)
+    else:
+        metrics.inc("cache_requests_total", result="coalesced")
+
+    # shielded, so one interaction giving up doesn't cancel the fetch the others wait for
+    return await asyncio.shield(task)
+
+
+async def _load_channel(channel: discord.TextChannel | discord.Thread, cache: QuoteCache) -> QuoteView:
+    """Load a channel into the cache: stored quotes first, then whatever Discord has that's newer."""
+    # load what we already parsed before, then only fetch what's new
+    store = cache.store
+    stored_messages: list[QuoteMessage] = []
+    last_id = None
+    if store is not None:
+        stored_messages = await store.run(store.load_channel, channel.id)
+        last_id = await store.run(store.last_message_id, channel.id)
+
+    # fetch the rest using discord's API:
+    # first-time (or unfinished) indexing scans ranges in parallel, catching up scans sequentially
+    if last_id is None or await store.run(store.load_ranges, channel.id):
+        new_messages = await backfill_channel_parallel(channel, cache)
+    else:
+        new_messages = await backfill_channel(channel, cache, discord.Object(id=last_id))
+
+    # save history to cache, in message order (a resumed backfill fills gaps between stored messages)
+    merged = heapq.merge(stored_messages, new_messages, key=lambda message: message[0])
+    cache.replace_channel(await build_channel(channel.id, merged))
+    return cache.get_quote_history(channel.id)
+
+
+# ========== Refreshing ==========
+async def refresh_channel(
+        channel: discord.TextChannel | discord.Thread,
+        cache: QuoteCache,
+        rebuild: bool = False
+    ) -> QuoteView:
+    """
+    Bring a cached channel up to date while the current cache keeps being served.
+
+    Args:
+        channel (discord.TextChannel | discord.Thread): Channel to refresh
+        cache (QuoteCache): A QuoteCache instance
+        rebuild (bool): Forget everything stored and rescan the whole channel, which also picks up
+            edits and deletes that happened while the bot was offline. Otherwise only messages newer
+            than the store's high-water mark are fetched (e.g. ones missed during a gateway outage).
+            Live ingestion never moves that mark, so messages missed by the gateway are always newer than it.
+            Without a store there is no mark (the newest cached message may be a live one), so this always rebuilds.
+
+    If the channel is being loaded for the first time, this waits for that load first,
+    both would otherwise backfill (and store) the same snowflake ranges.
+    """
+    loading = cache.loading.get(channel.id)
+    if loading is not None:
+        try:
+            await asyncio.shield(loading)
+        except Exception:
+            pass        # the load failed, the refresh below scans the channel itself
+
+    store = cache.store
+    rebuild = rebuild or store is None or not cache.has_channel(channel.id)
+
+    if rebuild:
+        started_at = discord.utils.time_snowflake(discord.utils.utcnow())
+        if store is not None:
+            await store.run(store.clear_channel, channel.id)
+        messages = await backfill_channel_parallel(channel, cache)
+
+        # quotes ingested live since the scan started are only in the old cache, keep them
+        cache.replace_channel(await build_channel(channel.id, messages), keep_after=started_at)
+    else:
+        last_id = await store.run(store.last_message_id, channel.id)
+        after = discord.Object(id=last_id) if last_id is not None else None
+        cache.cache_quote_history(channel.id, await backfill_channel(channel, cache, after))
+        cache.mark_fresh(channel.id)
+
+    metrics.inc("cache_refreshes_total", kind="rebuild" if rebuild else "incremental")
+    return cache.get_quote_history(channel.id)
+
+
+def start_refresh(
+        channel: discord.TextChannel | discord.Thread,
+        cache: QuoteCache,
+        rebuild: bool = False
+    ) -> Optional[asyncio.Task]:
+    """
+    Refresh a channel in the background. Returns the task, or None if a refresh is already running.
+    """
+    if channel.id in cache.refreshing:
+        return None
+
+    task = asyncio.create_task(refresh_channel(channel, cache, rebuild))
+    cache.refreshing[channel.id] = task
+
+    def done(finished: asyncio.Task):
+        if cache.refreshing.get(channel.id) is finished:
+            del cache.refreshing[channel.id]
+        if not finished.cancelled() and finished.exception() is not None:
+            metrics.inc("cache_refresh_errors_total")
+            cache.mark_refresh_failed(channel.id)
+            print(f"Refreshing channel {channel.id} failed: {finished.exception()!r}")
+    task.add_done_callback(done)
+
+    return task
+
+
+# ========== Live Ingestion Functions ==========
+def ingest_message(cache: QuoteCache, channel_id: int, message_id: int, content: str, sender_id: int):
+    """
+    Apply a new or edited message to an already cached channel.
+
+    Channels that aren't cached are skipped: their next fetch picks the message up from Discord.
+    The high-water mark is left alone, only history scans move it: a message that never reached
+    the gateway (e.g. during an outage) is older than this one and would otherwise never be fetched.
+    An edit that removed all quotes of a message removes the message.
+    The store write is queued on the store's thread, gateway events don't wait for the disk.
+    """
+    if not cache.has_channel(channel_id):
+        return
+
+    quotes_with_sender = parse_quotes(content, sender_id)
+    if not quotes_with_sender:
+        forget_message(cache, channel_id, message_id)
+        return
+
+    cache.cache_quote_history(channel_id, [(message_id, quotes_with_sender)])
+    if cache.store is not None:
+        cache.store.submit(cache.store.save_messages, channel_id, [(message_id, quotes_with_sender)], None)
+
+
+def forget_message(cache: QuoteCache, channel_id: int, message_id: int):
+    """Remove a deleted message from an already cached channel."""
+    if not cache.has_channel(channel_id):
+        return
+
+    cache.remove_message(channel_id, message_id)
+    if cache.store is not None:
+        cache.store.submit(cache.store.delete_message, channel_id, message_id)
 
 
 async def fetch_random_quote(
         source_channel: discord.TextChannel | discord.Thread,
-        cache: QuoteCache
+        cache: QuoteCache,
+        daily: bool = False
     ) -> Optional[Quote]:
     """
     Select a random quote message from a channel.
+    Draws from the guild's ShuffleBag, so quotes don't repeat until every quote was shown.
 
     Args:
         source_channel (discord.TextChannel | discord.Thread): Channel or thread containing quotes.
         cache (QuoteCache): A QuoteCache instance
+        daily (bool): Skip the guild's recent daily quotes and record this pick as one
         
     Returns:
         Optional[Quote]: A list of (quote, author) tuples from a single message.
         Returns None if no quotes exist.
     """
-    history = await fetch_message_history_quotes(source_channel, cache)
+    with metrics.timer("phase_seconds", phase="history_fetch"):
+        history = await fetch_message_history_quotes(source_channel, cache)
     if not history:
         return None
-    
-    return random.choice(history)
+
+    guild_id = str(source_channel.guild.id)
+    with metrics.timer("phase_seconds", phase="selection"):
+        await cache.load_guild(source_channel.id, guild_id)
+        return cache.pick_random(source_channel.id, guild_id, daily)
 
 
-async def get_configured_channels(
-    guild_config: GuildConfig,
-    client: discord.Client
-) -> Optional[Tuple[discord.TextChannel, discord.abc.Messageable]]:
+async def fetch_random_quote_by_person(
+        source_channel: discord.TextChannel | discord.Thread,
+        cache: QuoteCache,
+        matcher: AliasMatcher,
+        person: str
+    ) -> Optional[Quote]:
     """
-    Get source and target channels as Discord objects.
-    
+    Select a random quote message in which a known user is quoted.
+    Uses the per-person index of the channel's tally, so no quotes are scanned or matched.
+
     Args:
-        guild_config: GuildConfig instance
-        client: Discord client (from interaction.client)
-    
+        source_channel (discord.TextChannel | discord.Thread): Channel or thread containing quotes.
+        cache (QuoteCache): A QuoteCache instance
+        matcher (AliasMatcher): The guild's alias matcher
+        person (str): Primary user name, as in GuildConfig.known_users
+
+    Returns:
+        Optional[Quote]: A list of (quote, author) tuples from a single message.
+        Returns None if the person was never quoted.
+    """
+    with metrics.timer("phase_seconds", phase="history_fetch"):
+        await fetch_message_history_quotes(source_channel, cache)
+
+    with metrics.timer("phase_seconds", phase="selection"):
+        return cache.pick_by_person(source_channel.id, str(source_channel.guild.id), matcher, person)
+
+
+async def search_quotes(
+        source_channel: discord.TextChannel | discord.Thread,
+        cache: QuoteCache,
+        query: str,
+        limit: int
+    ) -> list[tuple[int, Quote]]:
+    """
+    Full-text search over a channel's quotes (see `QuoteCache.search()`).
+    The first search of a channel builds its search index in the parse executor.
+
     Returns:
-        (source_channel, target_channel) or None if not configured/invalid
+        list[tuple[int, Quote]]: (message_id, quote) pairs, best match first
     """
-    source_id = guild_config.source_channel
-    target_id = guild_config.target_channel
-    
-    # Check if configured
-    if source_id is None or target_id is None:
-        return None
-    
-    # Fetch channels with error handling
-    try:
-        source_channel = await client.fetch_channel(source_id)
-        target_channel = await client.fetch_channel(target_id)
-    except (discord.InvalidData, discord.Forbidden, discord.NotFound):
-        return None
-    
-    # Type validation
-    if not isinstance(source_channel, discord.TextChannel):
-        return None
-    
-    if not isinstance(target_channel, discord.abc.Messageable):
-        return None
-    
-    return source_channel, target_channel
\ No newline at end of file
+    with metrics.timer("phase_seconds", phase="history_fetch"):
+        await fetch_message_history_quotes(source_channel, cache)
+
+    with metrics.timer("phase_seconds", phase="indexing"):
+        await cache.index_channel(source_channel.id, parse_executor)
+
+    with metrics.timer("phase_seconds", phase="search"):
+        return cache.search(source_channel.id, query, limit)
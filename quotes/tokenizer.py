@@ -0,0 +1,193 @@
+# ========== Imports ==========
+import re
+
+
+# ========== Constants ==========
+QUOTE_MARKS = '"“”'         # straight and curly quotes, any of them may open or close a quote
+DASHES = "-~–—"             # hyphen, tilde, en dash and em dash start an attribution
+
+# The original extraction regex: the fast path of extract_quotes() and the reference the scanner is
+# compared against (see benchmarks/tokenizer.py). It can't handle \r\n or blank lines before the
+# attribution, en/em dashes, attributions on the same line or quotes that contain quote marks.
+QUOTE_REGEX = re.compile(r'(?:"|“|”)([^"“”]+)(?:"|“|”)[\n]+[-~]\s*(.+)')
+
+MARK_REGEX = re.compile(f"[{QUOTE_MARKS}]")
+MARK_RUN_REGEX = re.compile(f"[{QUOTE_MARKS}][^{QUOTE_MARKS}]*")     # a mark, up to the next one
+NON_SPACE_REGEX = re.compile(r"\S")
+
+# A quote mark followed by an attribution: a dash after blank lines ("quote"\n\n- name) or after
+# a space on the same line ("quote" - name, not "quote" -word). The name may also be on the line
+# after the dash, `author` is where it starts (the end of the text if there is none).
+CLOSE_REGEX = re.compile(
+    f"[{QUOTE_MARKS}]"
+    f"(?:[ \\t]*[\\r\\n]\\s*[{DASHES}]+|(?P<inline>[ \\t]+)[{DASHES}]+(?=\\s))"
+    r"\s*(?P<author>)"
+)
+
+# Messages with more quote marks than this skip the regex fast path: the regex slows down with every
+# mark it has to retry from and the more marks, the likelier the scanner has to run after it anyway
+REGEX_MAX_MARKS = 8
+
+QuotePair = tuple[str, str]     # (quote, author)
+
+
+# ========== Regex Fast Path ==========
+def regex_quotes(content: str) -> list[QuotePair]:
+    """Extract (quote, author) pairs with QUOTE_REGEX."""
+    return QUOTE_REGEX.findall(content)
+
+
+def _regex_is_enough(matches: list[QuotePair], marks: int) -> bool:
+    """
+    Check that QUOTE_REGEX found exactly what `scan_quotes()` would: every one of the `marks` quote
+    marks of the message belongs to one of its matches (so nothing is nested, unmatched or in an
+    unsupported format) and no match has blank text or an author the scanner would trim.
+    """
+    if marks != 2 * len(matches):
+        return False
+    for quote, author in matches:
+        if not quote.strip() or author[-1].isspace() or author[0] in DASHES:
+            return False
+    return True
+
+
+# ========== Scanner Helpers ==========
+def _mark_side(content: str, pos: int) -> int:
+    """
+    Guess whether the quote mark at `pos` opens (1) or closes (-1) a quote, 0 if it can't be told.
+    Curly marks say it themselves; a straight mark opens when it hugs the word after it
+    (' "hi', '("hi') and closes when it hugs the word before it ('hi" ', 'hi",').
+    """
+    char = content[pos]
+    if char == "“":
+        return 1
+    if char == "”":
+        return -1
+
+    before = content[pos - 1] if pos > 0 else " "
+    after = content[pos + 1] if pos + 1 < len(content) else " "
+    if before.isspace() != after.isspace():
+        return 1 if before.isspace() else -1
+    if not before.isspace() and before.isalnum() != after.isalnum():
+        return 1 if after.isalnum() else -1
+    return 0
+
+
+def _balanced_opener(content: str, marks: list[int]) -> int:
+    """
+    Match the closing mark after `marks` with its opening mark, skipping closed pairs on the way:
+    '"a" said "b"' opens at "b, '"he said "hi" to me"' at the very first mark.
+    Marks that can't be told apart are skipped. Returns -1 if nothing balances.
+    """
+    depth = 1
+    for pos in reversed(marks):
+        depth -= _mark_side(content, pos)
+        if depth == 0:
+            return pos
+    return -1
+
+
+def _first(regex: re.Pattern, content: str, pos: int) -> int:
+    """Start of the first match of `regex` at or after `pos`, or the length of `content`."""
+    match = regex.search(content, pos)
+    return match.start() if match is not None else len(content)
+
+
+# ========== Scanner ==========
+def scan_quotes(content: str) -> list[QuotePair]:
+    """
+    Extract every (quote, author) pair of a message in a single pass.
+
+    CLOSE_REGEX finds the quote marks followed by an attribution, those are the possible closing marks.
+    Once one is accepted, its opening mark is found among the marks since the previous quote by
+    nesting depth (see `_mark_side()`), so quotes containing quoted words are kept whole. If the marks
+    don't balance, the nearest mark opens the quote, like QUOTE_REGEX does.
+    Same line attributions ("quote" - name) only count if the quote starts its line.
+
+    The regex engine skips everything that can't close a quote. The marks of a quote are only
+    collected once it's accepted and the text up to the end of its attribution is never looked at
+    again, the start of the current line is tracked as the scan moves forward and the opener of a
+    line is looked up once. So this runs in linear time, mostly in C.
+
+    Returns:
+        list[QuotePair]: (quote, author) pairs in message order, empty if there are none
+    """
+    if '"' not in content and "“" not in content and "”" not in content:
+        return []
+
+    found: list[QuotePair] = []
+    length = len(content)
+    segment = 0                 # start of the text not used by a quote yet
+    first_mark = next_mark = -1     # first quote mark in the segment, and the one after it
+    line_start = 0              # start of the line of the latest same line candidate
+    line_scanned = 0            # line_start accounts for every newline before this
+    line_key = -1               # (start of line) the opener below was looked up for
+    line_opener = line_text = 0     # first non-whitespace of that line, and after it
+
+    for match in CLOSE_REGEX.finditer(content):
+        close = match.start()
+        if close < segment:
+            continue            # marks inside the attribution line can't close the next quote
+        if first_mark < segment:
+            first_mark, next_mark = MARK_RUN_REGEX.search(content, segment).span()
+
+        # nothing to open the quote, or a dash without a name at the very end
+        author_start = match.start("author")
+        if first_mark >= close or author_start == length:
+            continue
+
+        if match.group("inline") is not None:
+            # only "quote" - name as a line of its own, not "... she said "no" - to everything"
+            newline = content.rfind("\n", line_scanned, close)
+            if newline >= 0:
+                line_start = newline + 1
+            line_scanned = close
+
+            key = max(line_start, segment)
+            if key != line_key:
+                line_key = key
+                line_opener = _first(NON_SPACE_REGEX, content, key)
+                line_text = _first(NON_SPACE_REGEX, content, line_opener + 1)
+            if content[line_opener] not in QUOTE_MARKS or line_text >= close:
+                continue
+            opener = line_opener
+        elif next_mark == close:
+            opener = first_mark     # the usual "quote"\n- name, nothing to choose from
+        else:
+            marks = [mark.start() for mark in MARK_REGEX.finditer(content, segment, close)]
+            opener = _balanced_opener(content, marks)
+            if opener < 0:
+                opener = marks[-1]
+
+        end = content.find("\n", author_start)
+        if end < 0:
+            end = length
+
+        quote = content[opener + 1:close]
+        if quote.strip():
+            found.append((quote, content[author_start:end].rstrip()))
+
+        # nor open it
+        segment = line_scanned = end
+
+    return found
+
+
+def extract_quotes(content: str) -> list[QuotePair]:
+    """
+    Extract every (quote, author) pair of a message, the same result as `scan_quotes()`.
+
+    Most quote messages are a few plain "quote"\n- name blocks, which the C regex engine parses a few
+    times faster than the scanner. The regex result is used whenever it's provably complete.
+    Messages with more than REGEX_MAX_MARKS quote marks go straight to the scanner, which is as fast
+    as the regex on those, so no message is parsed twice in full.
+    """
+    if '"' not in content and "“" not in content and "”" not in content:
+        return []
+
+    marks = content.count('"') + content.count("“") + content.count("”")
+    if marks <= REGEX_MAX_MARKS:
+        matches = QUOTE_REGEX.findall(content)
+        if matches and _regex_is_enough(matches, marks):
+            return matches
+    return scan_quotes(content)
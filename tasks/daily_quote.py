@@ -1,44 +1,282 @@
+import asyncio
 import datetime
+import heapq
+import random
+import time
 import discord
 from discord.ext import tasks
+from typing import Awaitable, Callable, Iterable, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from core.cache import QuoteCache
 from core.config_manager import ConfigManager
-from core.quote_service import send_random_quote_for_guild
+from core.metrics import metrics
+from core.models import GuildConfig
+from core.quote_service import prepare_daily_quote_for_guild, send_prepared_quote, send_random_quote_for_guild
 
 
+# ========== Schedule Helpers ==========
+def parse_schedule(post_time: str, timezone: str) -> tuple[datetime.time, ZoneInfo]:
+    """
+    Validate a guild's schedule.
+
+    Raises:
+        ValueError: if the time isn't "HH:MM" or the timezone doesn't exist
+    """
+    try:
+        fire_time = datetime.datetime.strptime(post_time, "%H:%M").time()
+    except ValueError:
+        raise ValueError(f"'{post_time}' is not a valid time, use HH:MM (e.g. 09:00)")
+
+    try:
+        zone = ZoneInfo(timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"'{timezone}' is not a known timezone (e.g. Europe/Brussels)")
+
+    return fire_time, zone
+
+
+def next_fire_minute(guild_data: GuildConfig, now: datetime.datetime) -> int:
+    """Return the next time (as a UTC epoch minute) the guild's daily quote is due, strictly after `now`."""
+    try:
+        fire_time, zone = parse_schedule(guild_data.post_time, guild_data.timezone)
+    except ValueError:
+        fire_time, zone = datetime.time(hour=9), ZoneInfo("UTC")
+
+    local_now = now.astimezone(zone)
+    fire_at = datetime.datetime.combine(local_now.date(), fire_time, tzinfo=zone)
+    if fire_at <= local_now:
+        fire_at = datetime.datetime.combine(local_now.date() + datetime.timedelta(days=1), fire_time, tzinfo=zone)
+
+    return int(fire_at.timestamp()) // 60
+
+
+# ========== DailyQuoteScheduler Class ==========
 class DailyQuoteScheduler:
+    """
+    Posts the daily quote of every guild at the guild's own time and timezone.
+
+    Guilds are bucketed by the minute their next quote is due. A heap holds the bucket minutes,
+    so every tick only pops the buckets that are due instead of walking all guilds.
+    Rescheduling a guild just files it under a new minute; the stale bucket entry is skipped when popped.
+
+    Buckets are popped `prewarm_minutes` before they are due. Their guilds are then pre-warmed:
+    channels resolved and checked, history refreshed, quote picked and embed rendered.
+    At the exact fire time only the prepared embeds still have to be sent, so the quotes of all guilds
+    go out within seconds of each other. A guild that failed to pre-warm is done the normal way at fire time.
+
+    Due guilds are handed out to `workers` concurrent workers, so one slow guild doesn't hold up the rest.
+    Every guild gets `guild_timeout` seconds per attempt and rate limited (429) sends are retried
+    up to `max_retries` times with exponential backoff.
+    """
+
     def __init__(
         self,
         client: discord.Client,
         config_manager: ConfigManager,
         cache: QuoteCache,
-        hour: int = 9,
-        minute: int = 0,
+        workers: int = 10,
+        guild_timeout: float = 30.0,
+        max_retries: int = 3,
+        tick_seconds: float = 20.0,
+        prewarm_minutes: int = 5,
     ):
         self.client = client
         self.config_manager = config_manager
         self.cache = cache
-        self.daily_quote_loop = tasks.loop(time=datetime.time(hour=hour, minute=minute))(self._run_daily_quote)
+        self.workers = workers
+        self.guild_timeout = guild_timeout
+        self.max_retries = max_retries
+        self.prewarm_minutes = max(prewarm_minutes, 0)
+        self.last_run_stats: dict[str, float] = {}
+
+        self._heap: list[int] = []                      # bucket minutes
+        self._buckets: dict[int, list[str]] = {}        # minute -> guild_ids
+        self._next_fire: dict[str, int] = {}            # guild_id -> minute it's filed under
+        self._runs: set[asyncio.Task] = set()           # pre-warmed runs waiting for their fire time
+
+        self.daily_quote_loop = tasks.loop(seconds=tick_seconds)(self._tick)
+
+    # ---------- Scheduling ----------
+    def schedule(self, guild_data: GuildConfig, now: datetime.datetime | None = None):
+        """(Re)file a guild under the minute its next daily quote is due."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        minute = next_fire_minute(guild_data, now)
+        self._next_fire[guild_data.guild_id] = minute
+
+        if minute not in self._buckets:
+            self._buckets[minute] = []
+            heapq.heappush(self._heap, minute)
+        self._buckets[minute].append(guild_data.guild_id)
+
+    def unschedule(self, guild_id: int | str):
+        """Stop posting to a guild. Its bucket entry is dropped lazily."""
+        self._next_fire.pop(str(guild_id), None)
 
-    async def _run_daily_quote(self):
+    def _pop_due(self, until_minute: int) -> dict[int, list[str]]:
+        """Pop every guild whose bucket minute is at or before `until_minute`, grouped by that minute."""
+        due: dict[int, list[str]] = {}
+        while self._heap and self._heap[0] <= until_minute:
+            minute = heapq.heappop(self._heap)
+            for guild_id in self._buckets.pop(minute):
+                # skip entries of guilds that were rescheduled or removed since
+                if self._next_fire.get(guild_id) == minute:
+                    del self._next_fire[guild_id]
+                    due.setdefault(minute, []).append(guild_id)
+        return due
+
+    async def _tick(self):
         # ensure bot is ready
         await self.client.wait_until_ready()
 
-        for guild_data in self.config_manager.iter_guilds():
+        now = datetime.datetime.now(datetime.timezone.utc)
+        due = self._pop_due(int(now.timestamp()) // 60 + self.prewarm_minutes)
+
+        for minute, guild_ids in due.items():
+            guilds = [self.config_manager.get_guild(int(guild_id)) for guild_id in guild_ids]
+
+            # next fire is strictly after this one, even though it's pre-warmed before it
+            fired_at = datetime.datetime.fromtimestamp(minute * 60, datetime.timezone.utc)
+            for guild_data in guilds:
+                self.schedule(guild_data, fired_at)
+            rescheduled = {guild_data.guild_id: self._next_fire[guild_data.guild_id] for guild_data in guilds}
+
+            # runs wait for their fire time, don't hold up the loop while they do
+            task = asyncio.create_task(self._run_daily_quote(guilds, minute * 60, rescheduled))
+            self._runs.add(task)
+            task.add_done_callback(self._runs.discard)
+
+    # ---------- Posting ----------
+    async def _fan_out(self, guilds: list[GuildConfig], job: Callable[[GuildConfig], Awaitable[None]]):
+        """Run `job` for every guild on `workers` concurrent workers."""
+        queue: asyncio.Queue[GuildConfig] = asyncio.Queue()
+        for guild_data in guilds:
+            queue.put_nowait(guild_data)
+
+        async def worker():
+            while not queue.empty():
+                await job(queue.get_nowait())
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, queue.qsize()))))
+
+    async def _run_daily_quote(
+        self,
+        guilds: Iterable[GuildConfig],
+        fire_at: Optional[float] = None,
+        rescheduled: Optional[dict[str, int]] = None
+    ):
+        """
+        Pre-warm every guild, wait until `fire_at` (UTC epoch seconds), then send.
+
+        Args:
+            guilds: Guilds to post in
+            fire_at: When to send, None sends right after pre-warming
+            rescheduled: guild_id -> minute the guild was filed under afterwards.
+                Guilds that were rescheduled (/schedule) or removed while waiting are skipped.
+        """
+        start = time.perf_counter()
+        stats = {"posted": 0, "skipped": 0, "failed": 0, "fallback": 0}
+        prepared: dict[str, Optional[tuple[discord.abc.Messageable, discord.Embed]]] = {}
+
+        configured: list[GuildConfig] = []
+        for guild_data in guilds:
             if not guild_data.has_channels_configured():
+                stats["skipped"] += 1
                 continue
+            configured.append(guild_data)
 
+        # phase 1: everything but the send
+        async def prewarm(guild_data: GuildConfig):
             try:
-                await send_random_quote_for_guild(guild_data, self.client, self.cache)
-                
+                prepared[guild_data.guild_id] = await self._with_retry(
+                    lambda: prepare_daily_quote_for_guild(guild_data, self.client, self.cache)
+                )
             except Exception as exc:
-                print(f"Failed daily quote for guild {guild_data.guild_id}: {exc}")
+                print(f"Failed to pre-warm daily quote for guild {guild_data.guild_id}, retrying at post time: {exc!r}")
+
+        await self._fan_out(configured, prewarm)
+        prewarm_time = time.perf_counter() - start
+
+        # phase 2: wait for the post time
+        if fire_at is not None:
+            delay = fire_at - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        # phase 3: send
+        async def send(guild_data: GuildConfig):
+            guild_id = guild_data.guild_id
+            if rescheduled is not None and self._next_fire.get(guild_id) != rescheduled.get(guild_id):
+                stats["skipped"] += 1
+                return
+
+            try:
+                if guild_id in prepared:
+                    ready = prepared[guild_id]
+                    sent = ready is not None and await self._with_retry(lambda: send_prepared_quote(ready))
+                else:
+                    stats["fallback"] += 1
+                    sent = await self._with_retry(
+                        lambda: send_random_quote_for_guild(guild_data, self.client, self.cache)
+                    )
+                stats["posted" if sent else "skipped"] += 1
+
+            except Exception as exc:
+                stats["failed"] += 1
+                print(f"Failed daily quote for guild {guild_id}: {exc!r}")
+
+        send_start = time.perf_counter()
+        await self._fan_out(configured, send)
+
+        for result, amount in stats.items():
+            metrics.inc("daily_quotes_total", amount, result=result)
+        metrics.observe("daily_run_seconds", prewarm_time, phase="prewarm")
+        metrics.observe("daily_run_seconds", time.perf_counter() - send_start, phase="send")
+
+        self.last_run_stats = {
+            **stats,
+            "prewarm_time": prewarm_time,
+            "send_time": time.perf_counter() - send_start,
+            "wall_time": time.perf_counter() - start,
+        }
+        print(
+            f"Daily quote run: {stats['posted']} posted, {stats['skipped']} skipped, "
+            f"{stats['failed']} failed ({stats['fallback']} not pre-warmed), "
+            f"pre-warm {prewarm_time:.2f}s, send {self.last_run_stats['send_time']:.2f}s"
+        )
+
+    async def _with_retry(self, attempt_fn: Callable[[], Awaitable]):
+        """Await `attempt_fn()` with a timeout per attempt, backing off and retrying on 429s."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await asyncio.wait_for(attempt_fn(), timeout=self.guild_timeout)
+
+            except discord.RateLimited as exc:
+                if attempt == self.max_retries:
+                    raise
+                delay = exc.retry_after
+
+            except discord.HTTPException as exc:
+                if exc.status != 429 or attempt == self.max_retries:
+                    raise
+                delay = 2 ** attempt
+
+            # jitter so retrying guilds don't all hit the API at the same moment
+            await asyncio.sleep(delay + random.uniform(0, 1))
+
+        return None
 
+    # ---------- Lifecycle ----------
     def start(self):
         if not self.daily_quote_loop.is_running():
+            now = datetime.datetime.now(datetime.timezone.utc)
+            for guild_data in self.config_manager.iter_guilds():
+                if guild_data.guild_id not in self._next_fire:
+                    self.schedule(guild_data, now)
             self.daily_quote_loop.start()
 
     def stop(self):
         if self.daily_quote_loop.is_running():
             self.daily_quote_loop.stop()
+        for task in list(self._runs):
+            task.cancel()